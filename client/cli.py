@@ -35,21 +35,19 @@ def upload_file(file_path, ocr_cache, prompt, prompt_file=None, model='llama3.2-
         return None
 
 def get_result(task_id, print_progress=False):
-    extracted_text_printed_once = False
-    result_url = os.getenv('RESULT_URL', f'http://localhost:8000/ocr/result/{task_id}')
+    pages_printed = 0
+    result_url = os.getenv('RESULT_URL', 'http://localhost:8000/ocr/result/') + task_id
     while True:
-        response = requests.get(result_url)
+        # Ask only for the pages extracted since the last poll
+        response = requests.get(result_url, params={'pages_from': pages_printed})
         result = response.json()
         if result['state'] != 'SUCCESS' and print_progress:
+            for page in result.pop('pages', []):
+                print(f"Extracted text (page {page['page']} of {page['pages_total']}):\n" + page['text'])
+                pages_printed += 1
             task_info = result.get('info')
             if task_info is not None:
-                if task_info.get('extracted_text'):
-                    if not extracted_text_printed_once:
-                        extracted_text_printed_once = True
-                        print("Extracted text:\n" + task_info.get('extracted_text'))
-                    else:
-                        del task_info['extracted_text']
-                del task_info['start_time']
+                task_info.pop('start_time', None)
             print(result)
         if response.status_code == 200:
             if result['state'] == 'SUCCESS':
@@ -59,6 +57,35 @@ def get_result(task_id, print_progress=False):
                 return None
         time.sleep(2)  # Wait for 2 seconds before checking again
 
+def stream_result(task_id):
+    """
+    Prints the extracted pages and LLM chunks as they are pushed by the server (Server-Sent Events)
+    and returns the final result - no polling.
+    """
+    stream_url = os.getenv('STREAM_URL', 'http://localhost:8000/ocr/stream/') + task_id
+    with requests.get(stream_url, stream=True, headers={'Accept': 'text/event-stream'}) as response:
+        if response.status_code != 200:
+            print(f"Failed to stream the result: {response.text}")
+            return None
+
+        for line in response.iter_lines(decode_unicode=True):
+            if not line or not line.startswith('data:'):
+                continue  # event names are repeated in the data, keep-alive comments are skipped
+
+            event = json.loads(line[len('data:'):])
+            if event['event'] == 'page':
+                source = ' (from cache)' if event.get('from_cache') else ''
+                print(f"\n--- Page {event['page']} of {event['pages_total']}{source} ---\n{event['text']}", flush=True)
+            elif event['event'] == 'llm_chunk':
+                print(event['text'], end='', flush=True)
+            elif event['event'] == 'done':
+                print()
+                if event['state'] == 'SUCCESS':
+                    return event['result']
+                print(f"OCR task failed: {event.get('error')}")
+                return None
+    return None
+
 def parse_extracted_data(extracted_text):
     """
     Parses the LLM's output and constructs the JSON object.
@@ -218,11 +245,13 @@ def main():
     ocr_parser.add_argument('--model', type=str, default='llama3.2-vision', help='Model to use for the Ollama endpoint')
     ocr_parser.add_argument('--strategy', type=str, default='marker', help='OCR strategy to use for the file')
     ocr_parser.add_argument('--print_progress', default=True, action='store_true', help='Print the progress of the OCR task')
+    ocr_parser.add_argument('--stream', default=False, action='store_true', help='Stream the pages and LLM output as they are ready instead of polling for the result')
 
     # Sub-command for getting the result
     result_parser = subparsers.add_parser('result', help='Get the OCR result by specified task id.')
     result_parser.add_argument('--task_id', type=str, help='Task Id returned by the upload command')
     result_parser.add_argument('--print_progress', default=True, action='store_true', help='Print the progress of the OCR task')
+    result_parser.add_argument('--stream', default=False, action='store_true', help='Stream the pages and LLM output as they are ready instead of polling for the result')
 
     # Sub-command for clearing the cache
     clear_cache_parser = subparsers.add_parser('clear_cache', help='Clear the OCR result cache')
@@ -250,13 +279,19 @@ def main():
             print(json.dumps(parsed_data, indent=2, ensure_ascii=False))
         elif result:
             print("File uploaded successfully. Task Id: " + result.get('task_id') + " Waiting for the result...")
-            text_result = get_result(result.get('task_id'), args.print_progress)
+            if args.stream:
+                text_result = stream_result(result.get('task_id'))
+            else:
+                text_result = get_result(result.get('task_id'), args.print_progress)
             if text_result:
                 # Assuming text_result is the LLM's output
                 parsed_data = parse_extracted_data(text_result)
                 print(json.dumps(parsed_data, indent=2, ensure_ascii=False))
     elif args.command == 'result':
-        text_result = get_result(args.task_id, args.print_progress)
+        if args.stream:
+            text_result = stream_result(args.task_id)
+        else:
+            text_result = get_result(args.task_id, args.print_progress)
         if text_result:
             parsed_data = parse_extracted_data(text_result)
             print(json.dumps(parsed_data, indent=2, ensure_ascii=False))
@@ -19,7 +19,11 @@ source .dvenv/bin/activate
 
 if [ "$APP_TYPE" = "celery" ]; then
    echo "Starting Celery worker..."
-   exec celery -A text_extract_api.celery_app worker --loglevel=info --pool=solo
+   if [ -n "$CELERY_STRATEGIES" ]; then
+      exec python -m text_extract_api.worker $CELERY_STRATEGIES --loglevel=info
+   fi
+   exec celery -A text_extract_api.celery_app worker --loglevel=info --pool="${CELERY_POOL:-solo}" \
+      ${CELERY_QUEUES:+-Q "$CELERY_QUEUES"} ${CELERY_CONCURRENCY:+--concurrency="$CELERY_CONCURRENCY"}
 else
    echo "Pulling LLM models, please wait until this process is done..."
    python client/cli.py llm_pull --model llama3.1
@@ -0,0 +1,94 @@
+import threading
+import time
+import unittest
+
+from text_extract_api.extract.strategies.easyocr import ReaderPool
+
+
+class StubReaderFactory:
+    """
+    Stands in for `easyocr.Reader` - records the loads, optionally taking `load_time` seconds.
+    """
+
+    def __init__(self, load_time: float = 0):
+        self.load_time = load_time
+        self.loaded = []
+        self.lock = threading.Lock()
+
+    def __call__(self, languages):
+        time.sleep(self.load_time)
+        with self.lock:
+            self.loaded.append(languages)
+        return f"reader {','.join(languages)}"
+
+
+class TestReaderPool(unittest.TestCase):
+
+    def test_languages_are_normalized(self):
+        self.assertEqual(ReaderPool.normalize_languages("en, de,en"), ("de", "en"))
+        with self.assertRaises(ValueError):
+            ReaderPool.normalize_languages(" , ")
+
+    def test_readers_are_reused_per_language_set(self):
+        factory = StubReaderFactory()
+        pool = ReaderPool(2, reader_factory=factory)
+
+        self.assertEqual(pool.get("en,de"), "reader de,en")
+        self.assertEqual(pool.get("de, en"), "reader de,en")
+
+        self.assertEqual(factory.loaded, [["de", "en"]])
+        stats = pool.stats()
+        self.assertEqual((stats['size'], stats['hits'], stats['misses'], stats['evictions']), (1, 1, 1, 0))
+
+    def test_least_recently_used_reader_is_evicted(self):
+        factory = StubReaderFactory()
+        pool = ReaderPool(2, reader_factory=factory)
+        pool.get("en")
+        pool.get("de")
+        pool.get("en")
+        pool.get("fr")  # evicts de
+
+        pool.get("en")
+        pool.get("de")
+
+        self.assertEqual(factory.loaded, [["en"], ["de"], ["fr"], ["de"]])
+        self.assertEqual(pool.stats()['evictions'], 2)
+        self.assertEqual(pool.stats()['size'], 2)
+
+    def test_loaded_readers_are_not_blocked_by_a_load(self):
+        pool = ReaderPool(2, reader_factory=StubReaderFactory())
+        pool.get("en")
+        pool.reader_factory = StubReaderFactory(load_time=0.5)
+        loading = threading.Thread(target=pool.get, args=("de",))
+        loading.start()
+        time.sleep(0.05)
+
+        start_time = time.time()
+        self.assertEqual(pool.get("en"), "reader en")
+        self.assertLess(time.time() - start_time, 0.2)
+        loading.join()
+
+    def test_concurrent_requests_load_the_reader_once(self):
+        factory = StubReaderFactory(load_time=0.1)
+        pool = ReaderPool(2, reader_factory=factory)
+
+        threads = [threading.Thread(target=pool.get, args=("en",)) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(factory.loaded, [["en"]])
+        self.assertEqual((pool.stats()['hits'], pool.stats()['misses']), (3, 1))
+
+    def test_failed_load_can_be_retried(self):
+        pool = ReaderPool(2, reader_factory=lambda languages: 1 / 0)
+        with self.assertRaises(ZeroDivisionError):
+            pool.get("en")
+
+        pool.reader_factory = StubReaderFactory()
+        self.assertEqual(pool.get("en"), "reader en")
+
+
+if __name__ == '__main__':
+    unittest.main()
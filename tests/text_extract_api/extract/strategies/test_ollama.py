@@ -0,0 +1,148 @@
+import threading
+import unittest
+from contextlib import contextmanager
+from unittest.mock import patch
+
+from text_extract_api.extract.llm_chunks import LLM_MERGE_PROMPT
+from text_extract_api.extract.strategies.ollama import OllamaStrategy
+from text_extract_api.files.file_formats.image import ImageFileFormat
+from tests.text_extract_api.extract.strategies.test_strategy import FakePdfFileFormat, cached_pages_context
+
+
+class CountingPdfFileFormat(FakePdfFileFormat):
+    """
+    Counts the pages rasterized so far.
+    """
+
+    def __init__(self, num_pages: int):
+        super().__init__(num_pages)
+        self.pages_rasterized = 0
+
+    def convert_to_iterator(self, target_format):
+        for image in super().convert_to_iterator(target_format):
+            self.pages_rasterized += 1
+            yield image
+
+
+class FakeOllamaClient:
+    def __init__(self, answer):
+        self.answer = answer
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def chat(self, model, messages, stream=False, format=None, keep_alive=None):
+        pages = [image.decode() for image in messages[0]['images']]
+        with self.lock:
+            self.calls.append({'prompt': messages[0]['content'], 'pages': pages, 'format': format})
+        return iter([{'message': {'content': self.answer(messages[0]['content'], pages)}}])
+
+
+class FakeOllamaPool:
+    def __init__(self, client: FakeOllamaClient):
+        self._client = client
+
+    @contextmanager
+    def client(self, model=None):
+        yield self._client
+
+
+def ollama_strategy(**config) -> OllamaStrategy:
+    strategy = OllamaStrategy()
+    strategy.set_strategy_config({'model': 'vision', 'prompt': 'OCR', **config})
+    return strategy
+
+
+def separated_pages(prompt, pages):
+    return f"\n{OllamaStrategy.PAGE_SEPARATOR}\n".join(f"text of {page}" for page in pages)
+
+
+class TestOllamaExtractPageBatch(unittest.TestCase):
+
+    def extract(self, answer, context=None, **config):
+        client = FakeOllamaClient(answer)
+        with patch('text_extract_api.extract.strategies.ollama.ollama_pool', return_value=FakeOllamaPool(client)):
+            strategy = ollama_strategy(**config)
+            text = strategy.extract_text(FakePdfFileFormat(5), context=context(strategy) if context else None).text
+        return text, client.calls
+
+    def test_answer_is_split_into_pages(self):
+        text, calls = self.extract(separated_pages, pages_per_request=3)
+
+        self.assertEqual(text, "".join(f"text of page {page_number}" for page_number in range(1, 6)))
+        self.assertEqual([call['pages'] for call in calls],
+                         [['page 1', 'page 2', 'page 3'], ['page 4', 'page 5']])
+        self.assertIn(OllamaStrategy.PAGE_SEPARATOR, calls[0]['prompt'])
+        self.assertIn("The 3 images are consecutive pages", calls[0]['prompt'])
+
+    def test_pages_are_extracted_one_by_one_when_the_split_fails(self):
+        def answer(prompt, pages):
+            return "all pages in one" if len(pages) > 1 else f"text of {pages[0]}"
+
+        text, calls = self.extract(answer, pages_per_request=3)
+
+        self.assertEqual(text, "".join(f"text of page {page_number}" for page_number in range(1, 6)))
+        self.assertEqual([call['pages'] for call in calls],
+                         [['page 1', 'page 2', 'page 3'], ['page 1'], ['page 2'], ['page 3'],
+                          ['page 4', 'page 5'], ['page 4'], ['page 5']])
+        self.assertEqual(calls[1]['prompt'], 'OCR')
+
+    def test_cached_pages_are_not_sent(self):
+        text, calls = self.extract(separated_pages, lambda strategy: cached_pages_context(strategy, {2: 'cached 2'}),
+                                   pages_per_request=3)
+
+        self.assertEqual(text, "text of page 1cached 2text of page 3text of page 4text of page 5")
+        self.assertEqual([call['pages'] for call in calls], [['page 1'], ['page 3', 'page 4', 'page 5']])
+        self.assertIn("The 3 images are consecutive pages", calls[1]['prompt'])
+
+
+class TestOllamaExtractStructured(unittest.TestCase):
+
+    def extract(self, file_format, answer, **config):
+        client = FakeOllamaClient(answer)
+        with patch('text_extract_api.extract.strategies.ollama.ollama_pool', return_value=FakeOllamaPool(client)):
+            result = ollama_strategy(**config).extract_structured(file_format, 'Fill the form', {'type': 'object'})
+        return result.text, client.calls
+
+    def test_document_is_answered_in_one_request(self):
+        text, calls = self.extract(FakePdfFileFormat(6), lambda prompt, pages: '{"pages": 6}', pages_per_request=1)
+
+        self.assertEqual(text, '{"pages": 6}')
+        self.assertEqual(calls, [{'prompt': 'Fill the form',
+                                  'pages': [f'page {page_number}' for page_number in range(1, 7)],
+                                  'format': {'type': 'object'}}])
+
+    def test_parts_are_merged_in_page_order(self):
+        def answer(prompt, pages):
+            return 'merged' if prompt.startswith(LLM_MERGE_PROMPT) else ','.join(pages)
+
+        text, calls = self.extract(FakePdfFileFormat(5), answer, single_pass_pages=2, page_concurrency=3)
+
+        self.assertEqual(text, 'merged')
+        self.assertEqual(sorted(call['pages'] for call in calls[:-1]),
+                         [['page 1', 'page 2'], ['page 3', 'page 4'], ['page 5']])
+        self.assertEqual(calls[-1]['prompt'], LLM_MERGE_PROMPT + 'page 1,page 2\n\npage 3,page 4\n\npage 5')
+        self.assertEqual(calls[-1]['pages'], [])
+        self.assertTrue(all(call['format'] == {'type': 'object'} for call in calls))
+
+    def test_pages_are_rasterized_as_the_parts_are_sent(self):
+        file_format = CountingPdfFileFormat(12)
+        rasterized = []
+
+        def answer(prompt, pages):
+            rasterized.append((int(pages[-1].split()[-1]) if pages else 12, file_format.pages_rasterized))
+            return 'part'
+
+        self.extract(file_format, answer, single_pass_pages=2, page_concurrency=2)
+
+        # Pages of at most `page_concurrency` parts ahead are in memory, not the whole document
+        for last_page_sent, pages_rasterized in rasterized:
+            self.assertLessEqual(pages_rasterized, last_page_sent + 2 * 2)
+
+    def test_single_image(self):
+        file_format = ImageFileFormat(b'page', mime_type='image/jpeg')
+        text, calls = self.extract(file_format, lambda prompt, pages: 'answer')
+        self.assertEqual((text, len(calls)), ('answer', 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
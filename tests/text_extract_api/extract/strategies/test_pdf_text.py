@@ -0,0 +1,113 @@
+import ctypes
+import io
+import unittest
+from typing import List, Optional
+from unittest.mock import patch
+
+import pypdfium2
+import pypdfium2.raw as pdfium
+
+from text_extract_api.extract.extract_context import ExtractContext
+from text_extract_api.extract.extract_result import ExtractResult
+from text_extract_api.extract.strategies.pdf_text import PdfTextStrategy
+from text_extract_api.extract.strategies.strategy import Strategy
+from text_extract_api.files.file_formats.image import ImageFileFormat
+from text_extract_api.files.file_formats.pdf import PdfFileFormat
+
+
+def text_pdf(pages_text: List[Optional[str]]) -> PdfFileFormat:
+    """
+    PDF with a text layer on the pages with text; pages with None have no text, like scans.
+    """
+    document = pypdfium2.PdfDocument.new()
+    for page_text in pages_text:
+        page = document.new_page(200, 300)
+        if page_text:
+            text_object = pdfium.FPDFPageObj_NewTextObj(document.raw, b'Helvetica', 12.0)
+            text = ctypes.create_string_buffer((page_text + '\x00').encode('utf-16-le'))
+            pdfium.FPDFText_SetText(text_object, ctypes.cast(text, ctypes.POINTER(pdfium.FPDF_WCHAR)))
+            pdfium.FPDFPageObj_Transform(text_object, 1, 0, 0, 1, 10, 150)
+            pdfium.FPDFPage_InsertObject(page.raw, text_object)
+            pdfium.FPDFPage_GenerateContent(page.raw)
+    output = io.BytesIO()
+    document.save(output)
+    return PdfFileFormat(output.getvalue(), filename="document.pdf", mime_type="application/pdf")
+
+
+def fake_convert_pages(file_format, first_page=None, last_page=None):
+    for page_number in range(first_page, last_page + 1):
+        yield ImageFileFormat(f'image {page_number}'.encode(), mime_type='image/jpeg')
+
+
+class FakeOcrStrategy(Strategy):
+    @classmethod
+    def name(cls) -> str:
+        return "fake_ocr"
+
+    def extract_text(self, file_format, language='en', context=None) -> ExtractResult:
+        assert context is None or context.progress is None  # pages are recorded by the PDF strategy
+        return ExtractResult.from_text(f"ocr of {file_format.binary.decode()}")
+
+
+class PageRecorder:
+    def __init__(self):
+        self.pages = []
+
+    def add_page(self, page_number, pages_total, text, from_cache=False):
+        self.pages.append((page_number, pages_total, text))
+
+
+class TestPdfTextStrategy(unittest.TestCase):
+    TEXT_1 = "First page of the report, with a proper text layer."
+    TEXT_3 = "Third page of the report, also with its own text layer."
+
+    def setUp(self):
+        for target in (patch.object(PdfTextStrategy, '_ocr_strategy', return_value=FakeOcrStrategy()),
+                       patch('text_extract_api.extract.strategies.pdf_text.PdfToJpegConverter.convert_pages',
+                             side_effect=fake_convert_pages)):
+            self.convert_pages = target.start()
+            self.addCleanup(target.stop)
+
+    def strategy(self, **config) -> PdfTextStrategy:
+        strategy = PdfTextStrategy()
+        strategy.set_strategy_config({'ocr_strategy': 'fake_ocr', **config})
+        return strategy
+
+    def test_only_pages_without_text_are_ocred(self):
+        recorder = PageRecorder()
+        pdf = text_pdf([self.TEXT_1, None, self.TEXT_3, None, None])
+
+        text = self.strategy().extract_text(pdf, context=ExtractContext(progress=recorder)).text
+
+        self.assertEqual(text.split("\n\n"), [self.TEXT_1, "ocr of image 2", self.TEXT_3, "ocr of image 4",
+                                              "ocr of image 5"])
+        self.assertEqual([page[:2] for page in recorder.pages], [(page_number, 5) for page_number in range(1, 6)])
+        self.assertEqual(recorder.pages[1][2], "ocr of image 2")
+
+    def test_consecutive_pages_are_rasterized_together(self):
+        self.strategy().extract_text(text_pdf([None, None, self.TEXT_1, None, self.TEXT_3, None, None, None]))
+
+        self.assertEqual([(call.kwargs['first_page'], call.kwargs['last_page'])
+                          for call in self.convert_pages.call_args_list], [(1, 2), (4, 4), (6, 8)])
+
+    def test_text_pages_are_not_rasterized(self):
+        text = self.strategy().extract_text(text_pdf([self.TEXT_1, self.TEXT_3])).text
+
+        self.assertEqual(text, f"{self.TEXT_1}\n\n{self.TEXT_3}")
+        self.convert_pages.assert_not_called()
+
+    def test_pages_with_few_characters_count_as_images(self):
+        pdf = text_pdf(["Page 2 - scan", self.TEXT_3])
+
+        self.assertEqual(self.strategy().extract_text(pdf).text.split("\n\n")[0], "ocr of image 1")
+        self.assertEqual(self.strategy(min_chars_per_page=8).extract_text(pdf).text.split("\n\n")[0],
+                         "Page 2 - scan")
+
+    def test_images_are_ocred_as_a_whole(self):
+        image = ImageFileFormat(b'photo', mime_type='image/jpeg')
+
+        self.assertEqual(self.strategy().extract_text(image).text, "ocr of photo")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+import email
+import json
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pypdfium2
+
+from text_extract_api.extract.strategies.remote import RemoteStrategy
+from text_extract_api.files.file_formats.pdf import PdfFileFormat
+from tests.text_extract_api.files.file_formats.test_pdf import blank_pdf
+
+
+class MarkerStub(ThreadingHTTPServer):
+    """
+    Marker compatible endpoint - the output lists the page widths of the posted PDF
+    (`blank_pdf` pages are 100, 200, ... wide). The first `failures` requests get a 503,
+    responses are sent after `delay` seconds.
+    """
+
+    def __init__(self, failures: int = 0, delay: float = 0.1):
+        super().__init__(('127.0.0.1', 0), MarkerStubHandler)
+        self.failures = failures
+        self.delay = delay
+        self.requests = 0
+        self.running = 0
+        self.max_running = 0
+        self.lock = threading.Lock()
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/marker/upload"
+
+
+class MarkerStubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        with self.server.lock:
+            self.server.requests += 1
+            failing = self.server.requests <= self.server.failures
+            self.server.running += 1
+            self.server.max_running = max(self.server.max_running, self.server.running)
+        try:
+            if failing:
+                return self._json(503, {'error': 'busy'})
+
+            message = email.message_from_bytes(
+                f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode() + body)
+            pdf = next(part.get_payload(decode=True) for part in message.walk()
+                       if part.get_param('name', header='content-disposition') == 'file')
+            document = pypdfium2.PdfDocument(pdf)
+            threading.Event().wait(self.server.delay)
+            self._json(200, {'output': ' '.join(str(int(page.get_width())) for page in document)})
+        finally:
+            with self.server.lock:
+                self.server.running -= 1
+
+    def _json(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestRemoteStrategy(unittest.TestCase):
+
+    def setUp(self):
+        self.pdf = PdfFileFormat(blank_pdf(7), filename="document.pdf", mime_type="application/pdf")
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def strategy(self, **config):
+        strategy = RemoteStrategy()
+        strategy.set_strategy_config({'url': self.server.url, 'retry_backoff': 0, **config})
+        return strategy
+
+    def test_whole_document_is_posted_by_default(self):
+        self.server = MarkerStub()
+
+        text = self.strategy().extract_text(self.pdf).text
+
+        self.assertEqual(text, "100 200 300 400 500 600 700")
+        self.assertEqual(self.server.requests, 1)
+
+    def test_page_ranges_are_posted_concurrently_and_stitched_in_order(self):
+        self.server = MarkerStub()
+
+        text = self.strategy(pages_per_request=2, page_concurrency=4).extract_text(self.pdf).text
+
+        self.assertEqual(text, "100 200\n\n300 400\n\n500 600\n\n700")
+        self.assertEqual(self.server.requests, 4)
+        self.assertGreater(self.server.max_running, 1)
+
+    def test_failed_requests_are_retried(self):
+        self.server = MarkerStub(failures=2)
+
+        self.assertEqual(self.strategy(retries=2).extract_text(self.pdf).text, "100 200 300 400 500 600 700")
+        self.assertEqual(self.server.requests, 3)
+
+    def test_retries_are_bounded(self):
+        self.server = MarkerStub(failures=5)
+
+        with self.assertRaises(Exception):
+            self.strategy(retries=1).extract_text(self.pdf)
+        self.assertEqual(self.server.requests, 2)
+
+    def test_read_timeouts_are_not_retried(self):
+        self.server = MarkerStub(delay=1)
+
+        with self.assertRaises(Exception):
+            self.strategy(retries=3, timeout=0.2).extract_text(self.pdf)
+        self.assertEqual(self.server.requests, 1)
+
+    def test_read_timeouts_are_retried_when_allowed(self):
+        self.server = MarkerStub(delay=1)
+
+        with self.assertRaises(Exception):
+            self.strategy(retries=3, read_retries=1, timeout=0.2).extract_text(self.pdf)
+        self.assertEqual(self.server.requests, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,181 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+import fakeredis
+
+from text_extract_api.extract.cache import ResultCache
+from text_extract_api.extract.extract_context import ExtractContext
+from text_extract_api.extract.progress import ProgressReporter
+from text_extract_api.extract.strategies.strategy import Strategy
+from text_extract_api.files.file_formats.image import ImageFileFormat
+from text_extract_api.files.file_formats.pdf import PdfFileFormat
+
+
+class FakePdfFileFormat(PdfFileFormat):
+    def __init__(self, num_pages: int):
+        super().__init__(b'%PDF', mime_type='application/pdf')
+        self.num_pages = num_pages
+
+    def page_count(self) -> int:
+        return self.num_pages
+
+    def convert_to_iterator(self, target_format):
+        for page_number in range(1, self.num_pages + 1):
+            yield ImageFileFormat(f'page {page_number}'.encode(), mime_type='image/jpeg')
+
+
+class SlowStrategy(Strategy):
+    def __init__(self):
+        super().__init__()
+        self.running = 0
+        self.max_running = 0
+        self.lock = threading.Lock()
+
+    @classmethod
+    def name(cls) -> str:
+        return "slow"
+
+    def extract_page(self, image, language='en', page_number=1, num_pages=1, context=None) -> str:
+        with self.lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        time.sleep(0.05 if page_number % 2 else 0.01)  # odd pages finish last
+        with self.lock:
+            self.running -= 1
+        return image.binary.decode()
+
+
+class TestExtractPages(unittest.TestCase):
+
+    def test_pages_are_extracted_one_by_one(self):
+        strategy = SlowStrategy()
+        pages = list(strategy.extract_pages(FakePdfFileFormat(5)))
+
+        self.assertEqual(pages, [f'page {page_number}' for page_number in range(1, 6)])
+        self.assertEqual(strategy.max_running, 1)
+
+    def test_concurrent_pages_are_yielded_in_page_order(self):
+        strategy = SlowStrategy()
+        pages = list(strategy.extract_pages(FakePdfFileFormat(10), concurrency=4))
+
+        self.assertEqual(pages, [f'page {page_number}' for page_number in range(1, 11)])
+        self.assertEqual(strategy.max_running, 4)
+
+    def test_progress_of_the_last_page_is_written(self):
+        updates = []
+        progress = ProgressReporter(lambda state, meta: updates.append(meta['pages_done']),
+                                    fakeredis.FakeStrictRedis(), "task", min_interval=3600, min_step=7)
+
+        list(SlowStrategy().extract_pages(FakePdfFileFormat(30), context=ExtractContext(progress.update,
+                                                                                       progress=progress)))
+
+        self.assertEqual(updates[-1], 30)
+
+
+class BatchStrategy(Strategy):
+    def __init__(self):
+        super().__init__()
+        self.batches = []
+
+    @classmethod
+    def name(cls) -> str:
+        return "batch"
+
+    def extract_page(self, image, language='en', page_number=1, num_pages=1, context=None) -> str:
+        self.batches.append((page_number, [image.binary.decode()]))
+        return image.binary.decode()
+
+    def extract_page_batch(self, images, language='en', first_page_number=1, num_pages=1, context=None):
+        self.batches.append((first_page_number, [image.binary.decode() for image in images]))
+        return [image.binary.decode() for image in images]
+
+
+def cached_pages_context(strategy: Strategy, pages_text: dict) -> ExtractContext:
+    """
+    Context whose page cache has the given pages (page number to text) of `FakePdfFileFormat`.
+    """
+    page_cache = ResultCache(fakeredis.FakeStrictRedis(), "ocr_page")
+    for page_number, page_text in pages_text.items():
+        image = ImageFileFormat(f'page {page_number}'.encode(), mime_type='image/jpeg')
+        page_cache.set(page_cache.key(image.hash, strategy.name(), strategy.model(), 'en', strategy.config_version()),
+                       page_text)
+    return ExtractContext(page_cache=page_cache)
+
+
+class TestExtractPageBatches(unittest.TestCase):
+
+    def test_pages_are_batched(self):
+        strategy = BatchStrategy()
+        pages = list(strategy.extract_pages(FakePdfFileFormat(5), batch_size=2))
+
+        self.assertEqual(pages, [f'page {page_number}' for page_number in range(1, 6)])
+        self.assertEqual(strategy.batches, [(1, ['page 1', 'page 2']), (3, ['page 3', 'page 4']), (5, ['page 5'])])
+
+    def test_cached_page_ends_the_batch(self):
+        strategy = BatchStrategy()
+        context = cached_pages_context(strategy, {2: 'cached 2'})
+
+        pages = list(strategy.extract_pages(FakePdfFileFormat(5), context=context, concurrency=2, batch_size=3))
+
+        self.assertEqual(pages, ['page 1', 'cached 2', 'page 3', 'page 4', 'page 5'])
+        self.assertEqual(sorted(strategy.batches), [(1, ['page 1']), (3, ['page 3', 'page 4', 'page 5'])])
+
+
+class TestStrategyRegistry(unittest.TestCase):
+    PDF_TEXT_CLASS = 'text_extract_api.extract.strategies.pdf_text.PdfTextStrategy'
+
+    def setUp(self):
+        config_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(config_dir.cleanup)
+        self.config_path = os.path.join(config_dir.name, 'strategies.yaml')
+        self.write_config(min_chars_per_page=32)
+
+        registry = patch.multiple(Strategy, _strategies={}, _config=None, _config_mtime=None, _config_checked_at=0.0,
+                                  _configured_names=set(), _config_path=self.config_path, CONFIG_CHECK_INTERVAL=0)
+        registry.start()
+        self.addCleanup(registry.stop)
+
+    def write_config(self, min_chars_per_page: int, mtime: float = 1000):
+        with open(self.config_path, 'w') as f:
+            f.write(f"strategies:\n"
+                    f"  pdf_text:\n"
+                    f"    class: {self.PDF_TEXT_CLASS}\n"
+                    f"    min_chars_per_page: {min_chars_per_page}\n"
+                    f"  missing:\n"
+                    f"    class: text_extract_api.no_such_module.NoSuchStrategy\n")
+        os.utime(self.config_path, (mtime, mtime))
+
+    def test_unknown_strategies_fail_without_a_package_scan(self):
+        with patch('pkgutil.iter_modules', side_effect=AssertionError("packages scanned")):
+            with self.assertRaisesRegex(ValueError, "Unknown strategy 'nope'. Available: pdf_text, missing"):
+                Strategy.get_strategy('nope')
+            self.assertFalse(Strategy.exists('nope'))
+
+    def test_strategy_classes_are_imported_on_first_use(self):
+        self.assertTrue(Strategy.exists('missing'))  # nothing imported yet
+        with self.assertRaises(ModuleNotFoundError):
+            Strategy.get_strategy('missing')
+
+        strategy = Strategy.get_strategy('pdf_text')
+        self.assertIs(Strategy.get_strategy('pdf_text'), strategy)
+        self.assertEqual(type(strategy).__name__, 'PdfTextStrategy')
+
+    def test_changed_config_is_reloaded(self):
+        strategy = Strategy.get_strategy('pdf_text')
+        Strategy.register_strategy(SlowStrategy())
+        self.assertIs(Strategy.get_strategy('pdf_text'), strategy)
+
+        self.write_config(min_chars_per_page=64, mtime=2000)
+
+        reloaded = Strategy.get_strategy('pdf_text')
+        self.assertIsNot(reloaded, strategy)
+        self.assertEqual(reloaded._strategy_config['min_chars_per_page'], 64)
+        self.assertIsInstance(Strategy.get_strategy('slow'), SlowStrategy)  # registered in code - kept
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import time
+import unittest
+from unittest.mock import patch
+
+import fakeredis
+
+from text_extract_api.extract.cache import ResultCache
+
+
+class TestResultCache(unittest.TestCase):
+
+    def setUp(self):
+        self.redis_client = fakeredis.FakeStrictRedis()
+
+    def test_key_is_composed_of_all_parts(self):
+        cache = ResultCache(self.redis_client, "ocr")
+        key = cache.key("hash", "easyocr", None, "en", "config")
+        self.assertEqual(key, "cache:ocr:entry:hash:easyocr:None:en:config")
+        self.assertNotEqual(key, cache.key("hash", "llama_vision", None, "en", "config"))
+
+    def test_get_set_and_counters(self):
+        cache = ResultCache(self.redis_client, "ocr")
+        key = cache.key("hash", "easyocr")
+
+        self.assertIsNone(cache.get(key))
+        cache.set(key, "text")
+        self.assertEqual(cache.get(key), "text")
+
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["entries"]), (1, 1, 1))
+
+    def test_ttl(self):
+        cache = ResultCache(self.redis_client, "ocr", ttl=60)
+        cache.set(cache.key("hash"), "text")
+        self.assertGreater(self.redis_client.ttl(cache.key("hash")), 0)
+
+    def test_evicts_least_recently_used(self):
+        cache = ResultCache(self.redis_client, "ocr", max_entries=2)
+        cache.set(cache.key("a"), "a")
+        cache.set(cache.key("b"), "b")
+        cache.get(cache.key("a"))
+        cache.set(cache.key("c"), "c")
+
+        self.assertEqual(cache.get(cache.key("a")), "a")
+        self.assertIsNone(cache.get(cache.key("b")))
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_reads_do_not_keep_expired_entries_in_the_index(self):
+        cache = ResultCache(self.redis_client, "ocr", ttl=60, max_entries=2)
+        now = time.time()
+        with patch('time.time', return_value=now):
+            cache.set(cache.key("a"), "a")
+        with patch('time.time', return_value=now + 50):
+            cache.get(cache.key("a"))  # recently used, but expires 60s after it was set
+        self.redis_client.delete(cache.key("a"))  # expired by Redis
+
+        with patch('time.time', return_value=now + 61):
+            self.assertEqual(cache.stats()["entries"], 0)
+            cache.set(cache.key("b"), "b")
+            cache.set(cache.key("c"), "c")
+            self.assertEqual(cache.stats()["entries"], 2)
+            self.assertEqual(cache.stats()["evictions"], 0)
+
+    def test_expired_entries_are_not_counted_as_evictions(self):
+        cache = ResultCache(self.redis_client, "ocr", max_entries=1)
+        cache.set(cache.key("a"), "a")
+        self.redis_client.delete(cache.key("a"))  # expired or removed by Redis
+
+        cache.set(cache.key("b"), "b")
+        self.assertEqual(cache.stats()["evictions"], 0)
+        self.assertEqual(cache.stats()["entries"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
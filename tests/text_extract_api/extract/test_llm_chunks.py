@@ -0,0 +1,37 @@
+import unittest
+
+from text_extract_api.extract.llm_chunks import estimate_tokens, group_chunks, split_text
+
+
+class TestLlmChunks(unittest.TestCase):
+
+    def test_short_text_is_one_chunk(self):
+        self.assertEqual(split_text("  one page\n\nanother page \n", 100), ["one page\n\nanother page"])
+
+    def test_chunks_end_on_paragraph_boundaries(self):
+        paragraphs = [f"paragraph {number} " + "word " * 10 for number in range(20)]
+        chunks = split_text("\n\n".join(paragraphs), 40)
+
+        self.assertGreater(len(chunks), 1)
+        for chunk in chunks:
+            self.assertLessEqual(estimate_tokens(chunk), 40)
+            self.assertTrue(chunk.startswith("paragraph"))
+        self.assertEqual("\n\n".join(chunks), "\n\n".join(paragraphs).strip())
+
+    def test_long_paragraphs_are_split_on_lines_and_words(self):
+        text = "\n".join("line " * 30 for _ in range(4)) + "\n\n" + "x" * 100
+        chunks = split_text(text, 10)
+
+        for chunk in chunks:
+            self.assertLessEqual(len(chunk), 40)
+        self.assertEqual("".join(chunks).replace(" ", "").replace("\n", ""),
+                         text.replace(" ", "").replace("\n", ""))
+
+    def test_groups_fit_the_budget_and_always_shrink(self):
+        self.assertEqual(group_chunks(["a" * 20, "b" * 20, "c" * 20], 12), [["a" * 20, "b" * 20], ["c" * 20]])
+        self.assertEqual(group_chunks(["a" * 40] * 3, 10), [["a" * 40] * 2, ["a" * 40]])
+        self.assertEqual(group_chunks(["a", "b", "c"], 100), [["a", "b", "c"]])
+
+
+if __name__ == '__main__':
+    unittest.main()
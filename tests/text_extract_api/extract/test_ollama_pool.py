@@ -0,0 +1,153 @@
+import json
+import socket
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from text_extract_api.extract.ollama_pool import OllamaPool
+
+
+class FakeOllama(ThreadingHTTPServer):
+    """
+    Answers the Ollama endpoints used by the pool; `release` blocks `/api/generate` until set.
+    """
+
+    def __init__(self, loaded_models=(), available_models=()):
+        super().__init__(('127.0.0.1', 0), FakeOllamaHandler)
+        self.loaded_models = list(loaded_models)
+        self.available_models = list(available_models)
+        self.generated = 0
+        self.release = threading.Event()
+        self.release.set()
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if self.path == '/api/ps':
+            self._json({'models': [{'model': model, 'name': model} for model in self.server.loaded_models]})
+        elif self.path == '/api/tags':
+            self._json({'models': [{'model': model, 'name': model} for model in self.server.available_models]})
+        else:
+            self.send_error(404)
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        if not request.get('prompt'):  # load request
+            self.server.loaded_models.append(request['model'])
+            self.server.keep_alive = request.get('keep_alive')
+            return self._json({'model': request['model'], 'response': '', 'done': True})
+        self.server.release.wait(10)
+        self.server.generated += 1
+        self._json({'model': 'llama3.1', 'response': self.server.url, 'done': True})
+
+    def _json(self, body):
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def unused_url():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return f"http://127.0.0.1:{sock.getsockname()[1]}"
+
+
+class TestOllamaPool(unittest.TestCase):
+
+    def setUp(self):
+        self.servers = []
+
+    def tearDown(self):
+        for server in self.servers:
+            server.release.set()
+            server.shutdown()
+            server.server_close()
+
+    def server(self, **kwargs):
+        server = FakeOllama(**kwargs)
+        self.servers.append(server)
+        return server
+
+    def generate(self, pool, model='llama3.1'):
+        with pool.client(model) as client:
+            return client.generate(model, 'prompt')['response']
+
+    def test_requests_go_to_least_loaded_host(self):
+        busy, idle = self.server(), self.server()
+        pool = OllamaPool([busy.url, idle.url], health_check_interval=0)
+
+        busy.release.clear()
+        pending = threading.Thread(target=self.generate, args=(pool,))
+        pending.start()
+        while pool.hosts[0].in_flight == 0:
+            time.sleep(0.01)
+
+        self.assertEqual(self.generate(pool), idle.url)
+        busy.release.set()
+        pending.join()
+        self.assertEqual([host['requests'] for host in pool.stats()], [1, 1])
+        self.assertEqual([host['in_flight'] for host in pool.stats()], [0, 0])
+
+    def test_hosts_with_model_loaded_are_preferred(self):
+        cold = self.server(available_models=['llama3.1:latest'])
+        warm = self.server(loaded_models=['llama3.1:latest'], available_models=['llama3.1:latest'])
+        pool = OllamaPool([cold.url, warm.url], health_check_interval=0)
+        pool.check()
+
+        for request in range(3):
+            self.assertEqual(self.generate(pool, 'llama3.1'), warm.url)
+        self.assertEqual(self.generate(pool, 'other'), cold.url)  # nobody has it - least loaded
+
+    def test_dead_hosts_are_skipped(self):
+        alive = self.server()
+        pool = OllamaPool([unused_url(), alive.url], health_check_interval=0)
+        pool.check()
+
+        stats = pool.stats()
+        self.assertEqual([host['healthy'] for host in stats], [False, True])
+        self.assertIsNotNone(stats[0]['last_error'])
+        for request in range(3):
+            self.assertEqual(self.generate(pool), alive.url)
+
+    def test_failed_request_marks_host_unhealthy(self):
+        alive = self.server()
+        pool = OllamaPool([unused_url(), alive.url], health_check_interval=0)
+
+        with self.assertRaises(ConnectionError):
+            self.generate(pool)  # both idle - the first one is tried
+        self.assertEqual(self.generate(pool), alive.url)
+        self.assertEqual(pool.stats()[0]['failures'], 1)
+
+    def test_warm_models_are_loaded_again_when_unloaded(self):
+        pulled = self.server(available_models=['llama3.2-vision:latest'])
+        empty = self.server()
+        pool = OllamaPool([pulled.url, empty.url], health_check_interval=0)
+
+        pool.keep_warm('llama3.2-vision', '30m')
+        self.assertEqual(pulled.loaded_models, ['llama3.2-vision:latest'])
+        self.assertEqual(pulled.keep_alive, '30m')
+        self.assertEqual(empty.loaded_models, [])
+        self.assertEqual(pool.resident('llama3.2-vision'), [pulled.url])
+
+        pulled.loaded_models.clear()  # evicted
+        pool.check()
+        self.assertEqual(pool.resident('llama3.2-vision'), [])
+        pool.load_warm_models()
+        self.assertEqual(pool.resident('llama3.2-vision'), [pulled.url])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+
+from text_extract_api.celery_app import EXTRACT_TASK, LLM_TASK, STORE_TASK
+from text_extract_api.extract.pipeline import ocr_pipeline
+
+
+class TestOcrPipeline(unittest.TestCase):
+    JOB = {'id': 'job', 'single_flight_key': 'inflight:key'}
+
+    def pipeline(self, **kwargs):
+        params = dict(blob_ref='blob', strategy_name='llama_vision', filename='file.pdf', file_hash='hash',
+                      ocr_cache=True, language='en', single_flight_key='inflight:key', job_id='job')
+        params.update(kwargs)
+        return ocr_pipeline(**params).tasks
+
+    def test_extract_only(self):
+        stages = self.pipeline()
+
+        self.assertEqual([stage.task for stage in stages], [EXTRACT_TASK])
+        self.assertEqual(stages[0].args, ('blob', 'llama_vision', 'hash', True, 'en', 0))
+        self.assertEqual(stages[0].kwargs, {'job': self.JOB})
+        self.assertTrue(stages[0].immutable)
+
+    def test_prompt_and_storage(self):
+        stages = self.pipeline(prompt='Summarize', model='llama3.1', storage_profile='default',
+                               storage_filename='out.md', llm_cache=False, llm_chunk_tokens=1000, llm_reduce='merge',
+                               pages_per_task=10)
+
+        self.assertEqual([stage.task for stage in stages], [EXTRACT_TASK, LLM_TASK, STORE_TASK])
+        self.assertEqual(stages[0].args, ('blob', 'llama_vision', 'hash', True, 'en', 10))
+        self.assertEqual(stages[1].args, ('Summarize', 'llama3.1', False, 1000, 'merge'))
+        self.assertEqual(stages[2].args, ('file.pdf', 'default', 'out.md'))
+        self.assertTrue(all(stage.kwargs == {'job': self.JOB} for stage in stages))
+        self.assertFalse(stages[1].immutable)  # gets the result of the previous stage
+
+    def test_storage_without_prompt(self):
+        stages = self.pipeline(storage_profile='default')
+
+        self.assertEqual([stage.task for stage in stages], [EXTRACT_TASK, STORE_TASK])
+
+    def test_single_pass_skips_the_llm_stage(self):
+        schema = {'type': 'object'}
+        stages = self.pipeline(prompt='Total?', single_pass=True, json_schema=schema, llm_cache=False,
+                               storage_profile='default')
+
+        self.assertEqual([stage.task for stage in stages], [EXTRACT_TASK, STORE_TASK])
+        self.assertEqual(stages[0].args, ('blob', 'llama_vision', 'hash', True, 'en', 0, 'Total?', schema, False))
+
+    def test_single_pass_without_prompt_is_plain_extraction(self):
+        stages = self.pipeline(single_pass=True)
+
+        self.assertEqual([stage.task for stage in stages], [EXTRACT_TASK])
+        self.assertEqual(len(stages[0].args), 6)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import threading
+import unittest
+
+import fakeredis
+
+from text_extract_api.extract.progress import ProgressReporter
+
+
+class TestProgressReporter(unittest.TestCase):
+
+    def setUp(self):
+        self.redis_client = fakeredis.FakeStrictRedis()
+        self.updates = []
+
+    def update_state(self, state, meta):
+        self.updates.append((state, meta['progress']))
+
+    def test_updates_are_coalesced(self):
+        progress = ProgressReporter(self.update_state, self.redis_client, "task", min_interval=3600, min_step=5)
+
+        for chunk in range(100):
+            progress.update('PROGRESS', {'progress': 30})
+        progress.update('PROGRESS', {'progress': '36'})
+        progress.update('PROGRESS', {'progress': 37})
+        self.assertEqual(self.updates, [('PROGRESS', 30), ('PROGRESS', '36')])
+
+        progress.flush()
+        progress.update('DONE', {'progress': 37})
+        self.assertEqual(self.updates[2:], [('PROGRESS', 37), ('DONE', 37)])
+
+    def test_concurrent_updates_keep_the_last_progress(self):
+        progress = ProgressReporter(self.update_state, self.redis_client, "task", min_interval=3600, min_step=1000)
+        progress.update('PROGRESS', {'progress': 0})
+
+        def report(thread_number):
+            for step in range(500):
+                progress.update('PROGRESS', {'progress': thread_number})
+
+        threads = [threading.Thread(target=report, args=(thread_number,)) for thread_number in range(1, 5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        progress.update('PROGRESS', {'progress': 99})
+        progress.flush()
+
+        self.assertEqual(self.updates, [('PROGRESS', 0), ('PROGRESS', 99)])
+
+    def test_pages_are_appended_records(self):
+        progress = ProgressReporter(self.update_state, self.redis_client, "task")
+        progress.add_page(1, 2, "first")
+        progress.add_page(2, 2, "second", from_cache=True)
+
+        pages = ProgressReporter.pages(self.redis_client, "task")
+        self.assertEqual([page['text'] for page in pages], ["first", "second"])
+        self.assertEqual(ProgressReporter.pages(self.redis_client, "task", 1),
+                         [{'page': 2, 'pages_total': 2, 'text': "second", 'from_cache': True}])
+        self.assertGreater(self.redis_client.ttl(ProgressReporter.pages_key("task")), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+import unittest
+
+import fakeredis
+
+from text_extract_api.extract.single_flight import SingleFlight
+
+
+class TestSingleFlight(unittest.TestCase):
+
+    def setUp(self):
+        self.redis_client = fakeredis.FakeStrictRedis()
+        self.single_flight = SingleFlight(self.redis_client, ttl=60)
+        self.key = SingleFlight.key("ocr", "hash", "easyocr")
+
+    def test_key_is_composed_of_all_parts(self):
+        self.assertTrue(self.key.startswith("inflight:"))
+        self.assertEqual(self.key, SingleFlight.key("ocr", "hash", "easyocr"))
+        self.assertNotEqual(self.key, SingleFlight.key("ocr", "hash", "llama_vision"))
+
+    def test_second_acquire_is_coalesced(self):
+        self.assertEqual(self.single_flight.acquire(self.key, "task-1"), ("task-1", False))
+        self.assertEqual(self.single_flight.acquire(self.key, "task-2"), ("task-1", True))
+        self.assertGreater(self.redis_client.ttl(self.key), 0)
+
+    def test_release_frees_the_key(self):
+        self.single_flight.acquire(self.key, "task-1")
+        self.single_flight.release(self.key, "task-1")
+        self.assertEqual(self.single_flight.acquire(self.key, "task-2"), ("task-2", False))
+
+    def test_release_by_other_task_is_ignored(self):
+        self.single_flight.acquire(self.key, "task-1")
+        self.single_flight.release(self.key, "task-2")
+        self.assertEqual(self.single_flight.acquire(self.key, "task-3"), ("task-1", True))
+
+    def test_release_after_expiry_keeps_the_new_registration(self):
+        self.single_flight.acquire(self.key, "task-1")
+        self.redis_client.delete(self.key)  # expired
+        self.single_flight.acquire(self.key, "task-2")
+
+        self.single_flight.release(self.key, "task-1")
+        self.assertEqual(self.redis_client.get(self.key), b"task-2")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,176 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+import fakeredis
+
+from text_extract_api.extract import tasks
+from text_extract_api.extract.cache import ResultCache
+from text_extract_api.extract.events import TaskEvents
+from text_extract_api.extract.extract_result import ExtractResult
+from text_extract_api.extract.progress import ProgressReporter
+from text_extract_api.extract.single_flight import SingleFlight
+from text_extract_api.extract.strategies.strategy import Strategy
+from text_extract_api.files.blob_store import BlobStore
+from tests.text_extract_api.files.file_formats.test_pdf import blank_pdf
+
+
+class TasksTestCase(unittest.TestCase):
+    """
+    Runs the tasks in-process, on fake Redis and a temporary staging area.
+    """
+
+    def setUp(self):
+        self.redis_client = fakeredis.FakeStrictRedis()
+        self.blob_store = BlobStore(tempfile.mkdtemp())
+        self.ocr_cache = ResultCache(self.redis_client, "ocr")
+        self.llm_cache = ResultCache(self.redis_client, "llm")
+        for target in (patch.object(tasks, 'redis_client', self.redis_client),
+                       patch.object(tasks, 'blob_store', self.blob_store),
+                       patch.object(tasks, 'ocr_cache_tier', self.ocr_cache),
+                       patch.object(tasks, 'llm_cache_tier', self.llm_cache),
+                       patch.object(tasks, 'single_flight', SingleFlight(self.redis_client))):
+            target.start()
+            self.addCleanup(target.stop)
+
+
+class TestSinglePassExtractTask(TasksTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.strategy = MagicMock()
+        self.strategy.model.return_value = 'vision'
+        self.strategy.config_version.return_value = 'config'
+        self.strategy.extract_structured.side_effect = lambda *args: ExtractResult.from_text('{"total": 1}')
+        for target in (patch.object(Strategy, 'get_strategy', return_value=self.strategy),
+                       patch.object(tasks.extract_task, 'update_state')):
+            target.start()
+            self.addCleanup(target.stop)
+
+    def extract(self, prompt='Total?', output_format=None, llm_cache=True):
+        blob_ref = self.blob_store.put(blank_pdf(1))
+        return tasks.extract_task(blob_ref, 'llama_vision', 'hash', True, 'en', 0, prompt, output_format, llm_cache,
+                                  job={'id': 'job'})
+
+    def test_answer_is_cached_per_prompt_and_schema(self):
+        self.assertEqual(self.extract(), '{"total": 1}')
+        self.assertEqual(self.extract(), '{"total": 1}')
+        self.assertEqual(self.strategy.extract_structured.call_count, 1)
+
+        self.extract(prompt='Sum?')
+        self.extract(output_format={'type': 'object'})
+        self.assertEqual(self.strategy.extract_structured.call_count, 3)
+        self.strategy.extract_text.assert_not_called()
+
+        self.assertEqual(self.llm_cache.stats()['entries'], 3)
+        self.assertEqual(self.ocr_cache.stats()['entries'], 0)  # not mistaken for the OCR text
+
+    def test_llm_cache_can_be_bypassed(self):
+        self.extract()
+        self.extract(llm_cache=False)
+        self.assertEqual(self.strategy.extract_structured.call_count, 2)
+
+
+class TestJobDone(unittest.TestCase):
+
+    def setUp(self):
+        self.updates = []
+        self.progress = ProgressReporter(lambda state, meta: self.updates.append((state, meta['progress'])),
+                                         fakeredis.FakeStrictRedis(), "job", min_interval=3600)
+        self.progress.update('PROGRESS', {'progress': 75})
+        self.progress.update('PROGRESS', {'progress': 76})  # held back
+
+    def test_middle_stage_writes_the_held_back_progress(self):
+        tasks.job_done(tasks.llm_task, {'id': 'job'}, self.progress, 0)
+        self.assertEqual(self.updates, [('PROGRESS', 75), ('PROGRESS', 76)])
+
+    def test_last_stage_is_done(self):
+        tasks.job_done(tasks.llm_task, None, self.progress, 0)
+        self.assertEqual(self.updates, [('PROGRESS', 75), ('DONE', 100)])
+
+
+class TestCleanupOcrJob(TasksTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.blob_ref = self.blob_store.put(b'%PDF')
+        self.single_flight_key = "inflight:key"
+        tasks.single_flight.acquire(self.single_flight_key, 'job')
+        self.job = {'id': 'job', 'single_flight_key': self.single_flight_key}
+        self.pubsub = self.redis_client.pubsub(ignore_subscribe_messages=True)
+        self.pubsub.subscribe(TaskEvents.channel('job'))
+        mark_as_failure = patch.object(tasks.celery_app.backend, 'mark_as_failure')
+        self.mark_as_failure = mark_as_failure.start()
+        self.addCleanup(mark_as_failure.stop)
+
+    def cleanup(self, stage, task_id, state, retval=None, args=None, **kwargs):
+        tasks.cleanup_ocr_job(sender=stage, task_id=task_id, args=args or [], kwargs={'job': self.job, **kwargs},
+                              retval=retval, state=state)
+
+    def events(self):
+        messages = [self.pubsub.get_message(timeout=0.01) for _ in range(5)]  # the first one is the subscription
+        return [json.loads(message['data']) for message in messages if message]
+
+    def blob_exists(self) -> bool:
+        return os.path.exists(self.blob_store.path(self.blob_ref))
+
+    def job_running(self) -> bool:
+        return self.redis_client.get(self.single_flight_key) is not None
+
+    def test_extract_stage_removes_the_upload(self):
+        self.cleanup(tasks.extract_task, 'extract', 'SUCCESS', 'text', args=[self.blob_ref, 'easyocr'])
+
+        self.assertFalse(self.blob_exists())
+        self.assertEqual(self.events(), [])  # the next stage is on its way
+        self.assertTrue(self.job_running())
+
+    def test_last_stage_finishes_the_job(self):
+        self.cleanup(tasks.store_task, 'job', 'SUCCESS', 'text', args=['text', 'file.pdf', 'default'])
+
+        self.assertEqual(self.events(), [{'event': 'done', 'state': 'SUCCESS', 'result': 'text'}])
+        self.assertFalse(self.job_running())
+        self.assertTrue(self.blob_exists())
+        self.mark_as_failure.assert_not_called()
+
+    def test_failed_middle_stage_fails_the_job(self):
+        error = ValueError("LLM is down")
+        self.cleanup(tasks.llm_task, 'llm', 'FAILURE', error, args=['text', 'prompt'])
+
+        self.mark_as_failure.assert_called_once_with('job', error)
+        self.assertEqual(self.events(), [{'event': 'done', 'state': 'FAILURE', 'error': 'LLM is down'}])
+        self.assertFalse(self.job_running())
+
+    def test_failed_page_range_removes_the_upload(self):
+        self.cleanup(tasks.extract_pages_task, 'pages', 'FAILURE', ValueError("OCR failed"),
+                     args=[self.blob_ref, 'easyocr', True, 'en', 1, 10, 20])
+
+        self.assertFalse(self.blob_exists())
+        self.mark_as_failure.assert_called_once()
+        self.assertFalse(self.job_running())
+
+    def test_succeeded_page_range_keeps_the_upload(self):
+        self.cleanup(tasks.extract_pages_task, 'pages', 'SUCCESS', 'text',
+                     args=[self.blob_ref, 'easyocr', True, 'en', 1, 10, 20])
+
+        self.assertTrue(self.blob_exists())  # other page ranges may still need it
+        self.assertTrue(self.job_running())
+
+    def test_merged_pages_remove_the_upload(self):
+        self.cleanup(tasks.merge_pages_task, 'merge', 'SUCCESS', 'text', args=[['a', 'b']], blob_ref=self.blob_ref)
+
+        self.assertFalse(self.blob_exists())
+        self.assertTrue(self.job_running())
+
+    def test_retries_and_other_tasks_are_ignored(self):
+        self.cleanup(tasks.llm_task, 'llm', 'RETRY', ValueError("again"))
+        self.cleanup(None, 'other', 'FAILURE', ValueError("other"))
+
+        self.mark_as_failure.assert_not_called()
+        self.assertEqual(self.events(), [])
+        self.assertTrue(self.job_running())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import os
+import unittest
+from unittest.mock import patch
+
+from text_extract_api.files.converters.pdf_to_jpeg import PdfToJpegConverter
+from text_extract_api.files.file_formats.pdf import PdfFileFormat
+
+
+def fake_convert_from_path(pdf_path, first_page, last_page, output_folder, fmt, paths_only):
+    paths = []
+    for page_number in range(first_page, last_page + 1):
+        path = os.path.join(output_folder, f"page-{page_number:04d}.jpg")
+        with open(path, "wb") as page_file:
+            page_file.write(f"page {page_number}".encode())
+        paths.append(path)
+    return paths
+
+
+class TestPdfToJpegConverter(unittest.TestCase):
+
+    def setUp(self):
+        self.pdf = PdfFileFormat.from_binary(b"%PDF-1.4 fake", "doc.pdf", "application/pdf")
+
+    @patch("text_extract_api.files.converters.pdf_to_jpeg.pdfinfo_from_path", return_value={"Pages": 5})
+    @patch("text_extract_api.files.converters.pdf_to_jpeg.convert_from_path", side_effect=fake_convert_from_path)
+    def test_convert_renders_in_windows(self, mock_convert, mock_info):
+        pages = list(PdfToJpegConverter.convert_pages(self.pdf, window_size=2))
+
+        self.assertEqual([page.binary for page in pages], [f"page {i}".encode() for i in range(1, 6)])
+        self.assertEqual(pages[0].filename, "doc.pdf_page_1.jpg")
+        self.assertEqual(
+            [(call.kwargs["first_page"], call.kwargs["last_page"]) for call in mock_convert.call_args_list],
+            [(1, 2), (3, 4), (5, 5)]
+        )
+
+    @patch("text_extract_api.files.converters.pdf_to_jpeg.pdfinfo_from_path", return_value={"Pages": 5})
+    @patch("text_extract_api.files.converters.pdf_to_jpeg.convert_from_path", side_effect=fake_convert_from_path)
+    def test_convert_is_lazy(self, mock_convert, mock_info):
+        pages = PdfToJpegConverter.convert_pages(self.pdf, window_size=2)
+        next(pages)
+        self.assertEqual(mock_convert.call_count, 1)
+
+    @patch("text_extract_api.files.converters.pdf_to_jpeg.pdfinfo_from_path", return_value={"Pages": 5})
+    @patch("text_extract_api.files.converters.pdf_to_jpeg.convert_from_path", side_effect=fake_convert_from_path)
+    def test_convert_page_range(self, mock_convert, mock_info):
+        pages = list(PdfToJpegConverter.convert_pages(self.pdf, first_page=2, last_page=3, window_size=4))
+        self.assertEqual([page.binary for page in pages], [b"page 2", b"page 3"])
+
+    @patch("text_extract_api.files.converters.pdf_to_jpeg.pdfinfo_from_path", return_value={"Pages": 0})
+    def test_convert_empty_pdf(self, mock_info):
+        with self.assertRaises(ValueError):
+            list(PdfToJpegConverter.convert(self.pdf))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+import base64
+import unittest
+from unittest.mock import patch
+
+from pydantic import BaseModel, ValidationError
+
+from text_extract_api.files.file_formats.file_format import FileField
+from text_extract_api.files.file_formats.pdf import PdfFileFormat
+from tests.text_extract_api.files.file_formats.test_pdf import blank_pdf
+
+
+class Request(BaseModel):
+    file: FileField
+
+
+class TestFileField(unittest.TestCase):
+
+    def setUp(self):
+        self.pdf = blank_pdf(1)
+        self.value = base64.b64encode(self.pdf).decode()
+
+    def test_base64_is_decoded_once(self):
+        with patch('base64.b64decode', wraps=base64.b64decode) as b64decode, \
+                patch('base64.b64encode', wraps=base64.b64encode) as b64encode:
+            request = Request(file=self.value)
+            file_format = request.file.to_file_format("document.pdf")
+
+            self.assertIsInstance(file_format, PdfFileFormat)
+            self.assertEqual(file_format.binary, self.pdf)
+            self.assertEqual(file_format.base64_, self.value)  # not encoded again
+            self.assertEqual(str(request.file), self.value)
+
+        self.assertEqual(b64decode.call_count, 1)
+        b64encode.assert_not_called()
+
+    def test_empty_file_is_rejected(self):
+        with self.assertRaises(ValidationError):
+            Request(file="")
+
+    def test_serialized_as_base64(self):
+        self.assertEqual(Request(file=self.value).model_dump(), {'file': self.value})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,32 @@
+import io
+import unittest
+
+import pypdfium2
+
+from text_extract_api.files.file_formats.pdf import PdfFileFormat
+
+
+def blank_pdf(num_pages: int) -> bytes:
+    document = pypdfium2.PdfDocument.new()
+    for page_number in range(1, num_pages + 1):
+        document.new_page(100 * page_number, 100)  # page width tells the pages apart
+    output = io.BytesIO()
+    document.save(output)
+    return output.getvalue()
+
+
+class TestPdfFileFormat(unittest.TestCase):
+
+    def test_split_keeps_only_the_page_range(self):
+        pdf = PdfFileFormat(blank_pdf(5), filename="document.pdf", mime_type="application/pdf")
+
+        part = pdf.split(2, 4)
+
+        self.assertIsInstance(part, PdfFileFormat)
+        self.assertEqual(part.filename, "document.pdf")
+        document = pypdfium2.PdfDocument(part.binary)
+        self.assertEqual([document[index].get_width() for index in range(len(document))], [200, 300, 400])
+
+
+if __name__ == '__main__':
+    unittest.main()
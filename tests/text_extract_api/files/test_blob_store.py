@@ -0,0 +1,54 @@
+import os
+import tempfile
+import unittest
+from hashlib import md5
+
+from text_extract_api.files.blob_store import BlobStore
+
+
+class TestBlobWriter(unittest.TestCase):
+
+    def setUp(self):
+        self.blob_store = BlobStore(tempfile.mkdtemp())
+        self.data = os.urandom(10000)
+
+    def write(self, chunk_size: int, head_size: int = 2048):
+        with self.blob_store.writer(head_size) as writer:
+            for start in range(0, len(self.data), chunk_size):
+                writer.write(self.data[start:start + chunk_size])
+        return writer
+
+    def test_incremental_hash_matches_the_whole_file(self):
+        for chunk_size in (1, 333, 4096, 20000):
+            writer = self.write(chunk_size)
+            self.assertEqual(writer.hash, md5(self.data).hexdigest())
+            self.assertEqual(writer.size, len(self.data))
+            self.assertEqual(self.blob_store.get(writer.ref), self.data)
+
+    def test_head_is_cut_across_chunks(self):
+        for chunk_size in (1, 7, 100, 300, 20000):
+            self.assertEqual(self.write(chunk_size, head_size=256).head, self.data[:256])
+
+    def test_short_file_is_the_whole_head(self):
+        self.data = b"%PDF-1.4"
+        self.assertEqual(self.write(3, head_size=256).head, b"%PDF-1.4")
+
+    def test_failed_upload_leaves_no_file(self):
+        with self.assertRaises(ConnectionError):
+            with self.blob_store.writer() as writer:
+                writer.write(self.data[:100])
+                raise ConnectionError("client disconnected")
+
+        self.assertEqual(os.listdir(self.blob_store.root_path), [])
+        with self.assertRaises(FileNotFoundError):
+            self.blob_store.get(writer.ref)
+
+    def test_blob_is_visible_only_when_complete(self):
+        with self.blob_store.writer() as writer:
+            writer.write(self.data)
+            self.assertFalse(os.path.exists(self.blob_store.path(writer.ref)))
+        self.assertEqual(os.listdir(self.blob_store.root_path), [writer.ref])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import os
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from text_extract_api.celery_app import (app, EXTRACT_TASK, LLM_TASK, route_strategy_task, warm_up_worker,
+                                         worker_strategies)
+from text_extract_api.extract.strategies.strategy import Strategy
+
+
+class TestWorkerStrategies(unittest.TestCase):
+
+    def queues(self, *names):
+        queues = app.amqp.Queues(app.conf.task_queues)
+        if names:
+            queues.select(list(names))
+        return queues
+
+    def test_worker_without_queues_warms_up_nothing(self):
+        self.assertEqual(worker_strategies(self.queues()), [])
+
+    def test_strategies_of_the_consumed_queues(self):
+        self.assertEqual(worker_strategies(self.queues('ocr_ollama', 'llm')), ['llama_vision', 'minicpm_v'])
+        self.assertEqual(worker_strategies(self.queues('ocr_gpu')), ['easyocr'])
+
+    def test_stage_workers_warm_up_nothing(self):
+        self.assertEqual(worker_strategies(self.queues('llm', 'storage')), [])
+
+    @patch.dict(os.environ)
+    def test_worker_init_warms_up_the_consumed_strategies(self):
+        os.environ.pop('WORKER_STRATEGIES', None)
+        sender = SimpleNamespace(app=SimpleNamespace(amqp=SimpleNamespace(queues=self.queues('ocr_gpu'))),
+                                 pool_cls='solo')
+        with patch.object(Strategy, 'warm_up_strategies') as warm_up_strategies:
+            warm_up_worker(sender)
+        warm_up_strategies.assert_called_once_with(['easyocr'])
+        self.assertEqual(os.environ['WORKER_STRATEGIES'], 'easyocr')
+
+    @patch.dict(os.environ)
+    def test_prefork_worker_leaves_warm_up_to_the_pool_processes(self):
+        os.environ.pop('WORKER_STRATEGIES', None)
+        sender = SimpleNamespace(app=SimpleNamespace(amqp=SimpleNamespace(queues=self.queues('llm'))),
+                                 pool_cls='prefork')
+        with patch.object(Strategy, 'warm_up_strategies') as warm_up_strategies:
+            warm_up_worker(sender)
+        warm_up_strategies.assert_not_called()
+        self.assertEqual(os.environ['WORKER_STRATEGIES'], '')
+
+
+class TestRouteStrategyTask(unittest.TestCase):
+
+    def test_extract_goes_to_the_strategy_queue(self):
+        self.assertEqual(route_strategy_task(EXTRACT_TASK, ['blob', 'easyocr'], {}, {}), {'queue': 'ocr_gpu'})
+        self.assertEqual(route_strategy_task(EXTRACT_TASK, ['blob', 'pdf_text'], {}, {}), {'queue': 'ocr'})
+        self.assertIsNone(route_strategy_task(LLM_TASK, ['prompt'], {}, {}))
+        self.assertIsNone(route_strategy_task(EXTRACT_TASK, ['blob', 'unknown'], {}, {}))
+
+    def test_queue_follows_the_config(self):
+        info = {**Strategy.strategy_info('easyocr'), 'queue': 'ocr_gpu_new'}
+        with patch.object(Strategy, 'strategy_info', return_value=info):
+            self.assertEqual(route_strategy_task(EXTRACT_TASK, ['blob', 'easyocr'], {}, {}), {'queue': 'ocr_gpu_new'})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+from typing import Tuple
+from unittest.mock import MagicMock, patch
+
+import fakeredis
+from fastapi.testclient import TestClient
+
+os.environ.setdefault('UPLOAD_STAGING_PATH', tempfile.mkdtemp())
+
+from text_extract_api import main
+from text_extract_api.extract.events import TaskEvents
+from text_extract_api.extract.progress import ProgressReporter
+from text_extract_api.extract.single_flight import SingleFlight
+from text_extract_api.files.blob_store import BlobStore
+
+
+class TestSubmitOcrTask(unittest.TestCase):
+
+    def setUp(self):
+        self.redis_client = fakeredis.FakeStrictRedis()
+        self.blob_store = BlobStore(tempfile.mkdtemp())
+        self.pipeline = MagicMock()
+        for target in (patch.object(main, 'single_flight', SingleFlight(self.redis_client)),
+                       patch.object(main, 'blob_store', self.blob_store),
+                       patch.object(main, 'ocr_pipeline', self.pipeline)):
+            target.start()
+            self.addCleanup(target.stop)
+
+    def submit(self, key: str) -> Tuple[dict, str]:
+        blob_ref = self.blob_store.put(b"%PDF-1.4")
+        return main.submit_ocr_task([blob_ref, 'easyocr', 'file.pdf', 'hash', True], {}, key), blob_ref
+
+    def test_identical_request_is_coalesced(self):
+        first, first_blob = self.submit("inflight:key")
+        second, second_blob = self.submit("inflight:key")
+
+        self.assertFalse(first['coalesced'])
+        self.assertEqual(second, {'task_id': first['task_id'], 'coalesced': True})
+        self.pipeline.assert_called_once()
+        self.pipeline.return_value.apply_async.assert_called_once_with(task_id=first['task_id'])
+        self.assertTrue(os.path.exists(self.blob_store.path(first_blob)))
+        self.assertFalse(os.path.exists(self.blob_store.path(second_blob)))  # only the running job's upload is kept
+
+    def test_failed_enqueue_releases_the_key(self):
+        self.pipeline.return_value.apply_async.side_effect = ConnectionError("broker down")
+        with self.assertRaises(ConnectionError):
+            self.submit("inflight:key")
+
+        self.pipeline.return_value.apply_async.side_effect = None
+        result, _ = self.submit("inflight:key")
+        self.assertFalse(result['coalesced'])
+
+
+class TestOcrSingleFlightKey(unittest.TestCase):
+
+    def key(self, **kwargs) -> str:
+        params = dict(file_hash='hash', strategy_name='easyocr', language='en', prompt=None, model=None,
+                      storage_profile='default', storage_filename=None, filename='file.pdf')
+        params.update(kwargs)
+        return main.ocr_single_flight_key(**params)
+
+    def test_same_request_same_key(self):
+        self.assertEqual(self.key(), self.key())
+
+    def test_stored_filename_is_part_of_the_key(self):
+        self.assertNotEqual(self.key(), self.key(filename='other.pdf'))
+
+    def test_cache_bypass_is_part_of_the_key(self):
+        self.assertNotEqual(self.key(), self.key(ocr_cache=False))
+        self.assertNotEqual(self.key(), self.key(llm_cache=False))
+
+
+class FakeTask:
+    def __init__(self):
+        self.state = 'PROGRESS'
+
+    def ready(self):
+        return self.state == 'SUCCESS'
+
+    def successful(self):
+        return self.state == 'SUCCESS'
+
+    @property
+    def result(self):
+        return 'all pages'
+
+
+class TestOcrStream(unittest.TestCase):
+
+    def setUp(self):
+        server = fakeredis.FakeServer()
+        self.redis_client = fakeredis.FakeStrictRedis(server=server)
+        self.task = FakeTask()
+        for target in (patch.object(main, 'redis_client', self.redis_client),
+                       patch.object(main, 'async_redis_client', fakeredis.FakeAsyncRedis(server=server)),
+                       patch.object(main, 'AsyncResult', return_value=self.task)):
+            target.start()
+            self.addCleanup(target.stop)
+        # Published before the client subscribes
+        self.progress = ProgressReporter(None, self.redis_client, 'job')
+        self.progress.add_page(1, 3, 'page one')
+
+    def events(self, messages):
+        return [json.loads(message.split('data: ', 1)[1]) for message in messages if 'data: ' in message]
+
+    def test_pages_published_before_subscribing_are_replayed(self):
+        async def stream():
+            messages = []
+            async for message in main.stream_task_events('job'):
+                messages.append(message)
+                if '"state"' in message and '"done"' not in message:
+                    # Subscribed - the worker goes on
+                    self.progress.add_page(1, 3, 'page one')  # e.g. published while the records were read
+                    self.progress.add_page(2, 3, 'page two')
+                    TaskEvents(self.redis_client, 'job').publish('done', {'state': 'SUCCESS', 'result': 'all pages'})
+            return messages
+
+        events = self.events(asyncio.run(stream()))
+
+        self.assertEqual([(event['event'], event.get('page')) for event in events],
+                         [('page', 1), ('state', None), ('page', 2), ('done', None)])
+        self.assertEqual(events[0]['text'], 'page one')
+
+    def test_finished_task_streams_the_recorded_pages_and_the_result(self):
+        self.task.state = 'SUCCESS'
+        response = TestClient(main.app).get('/ocr/stream/job')
+
+        events = self.events(response.text.split('\n\n'))
+        self.assertEqual(events, [{'event': 'page', 'page': 1, 'pages_total': 3, 'text': 'page one',
+                                   'from_cache': False},
+                                  {'event': 'done', 'state': 'SUCCESS', 'result': 'all pages'}])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+# Imports the API in a fresh interpreter and reports the time, the peak RSS and the modules loaded
+IMPORT_SCRIPT = """
+import json, resource, sys, time
+start_time = time.perf_counter()
+import text_extract_api.main
+elapsed_time = time.perf_counter() - start_time
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({
+    'elapsed_time': elapsed_time,
+    'max_rss_mb': rss / (1024 * 1024 if sys.platform == 'darwin' else 1024),
+    'loaded': [module for module in json.loads(sys.argv[1]) if module in sys.modules],
+}))
+"""
+
+# OCR / ML libraries and clients only the workers need
+HEAVY_MODULES = [
+    'numpy', 'torch', 'cv2', 'easyocr', 'transformers', 'PIL', 'pdftext', 'pypdfium2',
+    'ollama', 'httpx', 'boto3', 'googleapiclient', 'text_extract_api.extract.tasks',
+]
+
+# Generous bounds - the import takes about 1s and 60MB, with the OCR libraries several times more
+MAX_IMPORT_TIME = 5
+MAX_RSS_MB = 150
+
+
+class TestApiStartup(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        with tempfile.TemporaryDirectory() as staging_path:
+            env = dict(os.environ, UPLOAD_STAGING_PATH=staging_path)
+            output = subprocess.run([sys.executable, '-c', IMPORT_SCRIPT, json.dumps(HEAVY_MODULES)],
+                                    env=env, capture_output=True, text=True, timeout=60, check=True).stdout
+        cls.report = json.loads(output.strip().splitlines()[-1])
+
+    def test_heavy_modules_are_not_imported(self):
+        self.assertEqual(self.report['loaded'], [])
+
+    def test_import_time(self):
+        self.assertLess(self.report['elapsed_time'], MAX_IMPORT_TIME)
+
+    def test_memory(self):
+        self.assertLess(self.report['max_rss_mb'], MAX_RSS_MB)
+
+
+if __name__ == '__main__':
+    unittest.main()
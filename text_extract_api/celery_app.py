@@ -1,8 +1,12 @@
+import os
 import pathlib
 import sys
+from typing import List
 
 from celery import Celery
+from celery.signals import worker_init, worker_process_init
 from dotenv import load_dotenv
+from kombu import Exchange, Queue
 
 sys.path.insert(0, str(pathlib.Path(__file__).parent.resolve()))
 
@@ -17,8 +21,111 @@ app = Celery(
     broker="redis://redis:6379/0",
     backend="redis://redis:6379/0"
 )
+# Every pipeline stage has its own queue, so OCR, LLM and storage workers can be scaled
+# and tuned (pool, concurrency) separately - see "Scaling the workers" in README.md.
+# Workers started without `-Q` consume all of them.
+# Tasks are referred to by name, so the API enqueues them without importing the task
+# module (and the OCR libraries behind it) - only the workers import it (see `include`).
+TASKS_MODULE = "text_extract_api.extract.tasks"
+EXTRACT_TASK = f"{TASKS_MODULE}.extract_task"
+EXTRACT_PAGES_TASK = f"{TASKS_MODULE}.extract_pages_task"
+MERGE_PAGES_TASK = f"{TASKS_MODULE}.merge_pages_task"
+LLM_TASK = f"{TASKS_MODULE}.llm_task"
+STORE_TASK = f"{TASKS_MODULE}.store_task"
+STAGE_QUEUES = {
+    EXTRACT_TASK: os.getenv("OCR_EXTRACT_QUEUE", "ocr"),
+    EXTRACT_PAGES_TASK: os.getenv("OCR_EXTRACT_QUEUE", "ocr"),
+    MERGE_PAGES_TASK: os.getenv("OCR_EXTRACT_QUEUE", "ocr"),
+    LLM_TASK: os.getenv("OCR_LLM_QUEUE", "llm"),
+    STORE_TASK: os.getenv("OCR_STORE_QUEUE", "storage"),
+}
+
+
+def load_strategy_queues() -> dict:
+    """
+    Strategy name to the extract queue set by its `queue` in config/strategies.yaml.
+    """
+    from text_extract_api.extract.strategies.strategy import Strategy
+    try:
+        strategies_config = Strategy.load_config()
+    except FileNotFoundError:
+        return {}
+    return {name: config['queue'] for name, config in strategies_config.items() if config.get('queue')}
+
+
+# Declared up front; queues added to the config later are created on first use
+STRATEGY_QUEUES = load_strategy_queues()
+
+
+def strategy_queue(strategy_name: str) -> str:
+    """
+    Extract queue of the strategy, as currently configured - a changed `queue` applies to
+    the next job without restarting the API (the workers consume the queues given at start).
+    """
+    from text_extract_api.extract.strategies.strategy import Strategy
+    return Strategy.strategy_info(strategy_name)['queue'] or STAGE_QUEUES[EXTRACT_TASK]
+
+
+def route_strategy_task(name, args, kwargs, options, task=None, **kw):
+    """
+    Routes the extract stage (and its page ranges) to the queue of its strategy - heavy strategies
+    (EasyOCR on GPU) and I/O-bound ones (Ollama, remote) then do not block each other.
+    """
+    if name not in (EXTRACT_TASK, EXTRACT_PAGES_TASK):
+        return None
+    strategy_name = kwargs.get('strategy_name') or (args[1] if len(args) > 1 else None)
+    try:
+        return {"queue": strategy_queue(strategy_name)} if strategy_name else None
+    except ValueError:  # unknown strategy - the task fails in the default queue
+        return None
+
+
 app.config_from_object({
-    "worker_max_memory_per_child": 8200000
+    "include": [TASKS_MODULE],
+    "worker_max_memory_per_child": 8200000,
+    "task_queues": [Queue(name, Exchange(name), routing_key=name)
+                    for name in dict.fromkeys(["celery", *STAGE_QUEUES.values(), *STRATEGY_QUEUES.values()])],
+    "task_routes": [route_strategy_task,
+                    {task_name: {"queue": queue} for task_name, queue in STAGE_QUEUES.items()}],
 })
 
-app.autodiscover_tasks(["text_extract_api.extract"], 'tasks', True)
+
+def worker_strategies(queues) -> List[str]:
+    """
+    Strategies whose extract queue the worker consumes. A worker started without `-Q`
+    consumes all the queues - it warms up nothing and loads the strategies on first use.
+    """
+    from text_extract_api.extract.strategies.strategy import Strategy
+    if queues.consume_from is queues:
+        return []
+    consumed = set(queues.consume_from)
+    return [name for name in Strategy.strategy_names() if strategy_queue(name) in consumed]
+
+
+def warm_up_strategies():
+    """
+    Preloads the strategies served by this worker - `WORKER_STRATEGIES`, set by
+    `text_extract_api.worker` or from the consumed queues when the worker starts.
+    """
+    from text_extract_api.extract.strategies.strategy import Strategy
+    names = [name.strip() for name in os.getenv('WORKER_STRATEGIES', '').split(',') if name.strip()]
+    if names:
+        Strategy.warm_up_strategies(names)
+
+
+@worker_process_init.connect
+def warm_up_pool_process(**kwargs):
+    warm_up_strategies()
+
+
+@worker_init.connect
+def warm_up_worker(sender=None, **kwargs):
+    if sender is None:
+        return
+    if 'WORKER_STRATEGIES' not in os.environ:
+        # Inherited by the pool processes
+        os.environ['WORKER_STRATEGIES'] = ','.join(worker_strategies(sender.app.amqp.queues))
+    # worker_process_init is sent by the prefork pool only - solo and thread pools run
+    # the tasks in the worker process itself
+    if 'prefork' not in str(getattr(sender, 'pool_cls', '')):
+        warm_up_strategies()
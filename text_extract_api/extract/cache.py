@@ -0,0 +1,148 @@
+import os
+import time
+from hashlib import md5
+from typing import Dict, Optional
+
+import redis
+
+
+class ResultCache:
+    """
+    Redis backed cache tier for extraction results.
+
+    Every tier lives in its own namespace and has its own settings:
+    - `ttl` - seconds after which an entry expires (0 or None - never),
+    - `max_entries` - size bound; once exceeded, the least recently used entries are evicted.
+    Hits and misses are counted in Redis, so the counters are shared by all workers.
+    """
+
+    def __init__(self, redis_client: redis.Redis, namespace: str, ttl: Optional[int] = None,
+                 max_entries: Optional[int] = None):
+        self.redis_client = redis_client
+        self.namespace = namespace
+        self.ttl = ttl or None
+        self.max_entries = max_entries or None
+        self._index_key = f"cache:{namespace}:index"  # entry keys by last access time - for the LRU eviction
+        self._expiry_key = f"cache:{namespace}:expiry"  # entry keys by the time they were set - for the TTL
+        self._stats_key = f"cache:{namespace}:stats"
+
+    @classmethod
+    def from_env(cls, redis_client: redis.Redis, namespace: str, env_prefix: str, default_ttl: int = 0,
+                 default_max_entries: int = 0) -> "ResultCache":
+        """
+        Reads `<env_prefix>_TTL` and `<env_prefix>_MAX_ENTRIES`, e.g. `OCR_CACHE_TTL`.
+        """
+        return cls(
+            redis_client,
+            namespace,
+            ttl=int(os.getenv(f"{env_prefix}_TTL", default_ttl)),
+            max_entries=int(os.getenv(f"{env_prefix}_MAX_ENTRIES", default_max_entries))
+        )
+
+    def key(self, *parts: str) -> str:
+        """
+        Composes an entry key from its parts, e.g. document hash, strategy, model, language.
+        """
+        return f"cache:{self.namespace}:entry:" + ":".join(str(part) for part in parts)
+
+    @staticmethod
+    def digest(value: Optional[str]) -> str:
+        """
+        Fixed length key part for long or arbitrary values like prompts and texts.
+        """
+        return md5((value or '').encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        value = self.redis_client.get(key)
+        if value is None:
+            pipeline = self.redis_client.pipeline()
+            pipeline.hincrby(self._stats_key, "misses", 1)
+            pipeline.zrem(self._index_key, key)  # in case it has expired
+            pipeline.zrem(self._expiry_key, key)
+            pipeline.execute()
+            return None
+
+        pipeline = self.redis_client.pipeline()
+        pipeline.hincrby(self._stats_key, "hits", 1)
+        pipeline.zadd(self._index_key, {key: time.time()})
+        pipeline.execute()
+        return value.decode('utf-8')
+
+    def set(self, key: str, value: str):
+        pipeline = self.redis_client.pipeline()
+        now = time.time()
+        pipeline.set(key, value, ex=self.ttl)
+        pipeline.zadd(self._index_key, {key: now})
+        if self.ttl:
+            pipeline.zadd(self._expiry_key, {key: now})
+        pipeline.execute()
+        self._evict()
+
+    def _evict(self):
+        self._drop_expired()
+
+        if self.max_entries:
+            excess = self.redis_client.zcard(self._index_key) - self.max_entries
+            if excess > 0:
+                evicted = [key for key, _ in self.redis_client.zpopmin(self._index_key, excess)]
+                pipeline = self.redis_client.pipeline()
+                pipeline.delete(*evicted)
+                pipeline.zrem(self._expiry_key, *evicted)
+                deleted, _ = pipeline.execute()
+                if deleted:  # keys expired in the meantime are not evictions
+                    self.redis_client.hincrby(self._stats_key, "evictions", deleted)
+
+    def _drop_expired(self):
+        """
+        Drops the entries expired by Redis from the index - by the time they were set, as
+        reading an entry does not extend its TTL.
+        """
+        if not self.ttl:
+            return
+        expired = self.redis_client.zrangebyscore(self._expiry_key, "-inf", time.time() - self.ttl)
+        if expired:
+            pipeline = self.redis_client.pipeline()
+            for key in expired:
+                pipeline.exists(key)
+            expired = [key for key, exists in zip(expired, pipeline.execute()) if not exists]  # not set again
+        if expired:
+            pipeline = self.redis_client.pipeline()
+            pipeline.zrem(self._index_key, *expired)
+            pipeline.zrem(self._expiry_key, *expired)
+            pipeline.execute()
+
+    def stats(self) -> Dict:
+        self._drop_expired()
+        stats = {key.decode('utf-8'): int(value) for key, value in self.redis_client.hgetall(self._stats_key).items()}
+        return {
+            "hits": stats.get("hits", 0),
+            "misses": stats.get("misses", 0),
+            "evictions": stats.get("evictions", 0),
+            "entries": self.redis_client.zcard(self._index_key),
+            "ttl": self.ttl,
+            "max_entries": self.max_entries,
+        }
+
+
+def ocr_result_cache(redis_client: redis.Redis) -> ResultCache:
+    """
+    Whole document OCR results - keyed by document hash, strategy, model, language and config version.
+    """
+    return ResultCache.from_env(redis_client, "ocr", "OCR_CACHE", default_ttl=7 * 24 * 3600,
+                                default_max_entries=10000)
+
+
+def ocr_page_cache(redis_client: redis.Redis) -> ResultCache:
+    """
+    Single page OCR results - keyed by page image hash, strategy, model, language and config version.
+    """
+    return ResultCache.from_env(redis_client, "ocr_page", "OCR_PAGE_CACHE", default_ttl=7 * 24 * 3600,
+                                default_max_entries=100000)
+
+
+def llm_result_cache(redis_client: redis.Redis) -> ResultCache:
+    """
+    LLM transformation results - keyed by hashes of the model, prompt and input text.
+    """
+    return ResultCache.from_env(redis_client, "llm", "LLM_CACHE", default_ttl=24 * 3600,
+                                default_max_entries=10000)
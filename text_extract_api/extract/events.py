@@ -0,0 +1,29 @@
+import json
+from typing import Dict, Optional
+
+import redis
+
+
+class TaskEvents:
+    """
+    Publishes task events to a Redis pub/sub channel - one channel per task id.
+
+    Events are JSON objects with the `event` name and its data:
+    - `page` - a page was extracted (`page`, `pages_total`, `text`, `from_cache`),
+    - `llm_chunk` - a chunk of text generated by the LLM (`text`),
+    - `done` - the task has finished (`state` and the `result` or `error`).
+    Nothing is stored - subscribers only receive events published while they listen.
+    """
+
+    def __init__(self, redis_client: redis.Redis, task_id: Optional[str]):
+        self.redis_client = redis_client
+        self.task_id = task_id
+
+    @staticmethod
+    def channel(task_id: str) -> str:
+        return f"ocr:events:{task_id}"
+
+    def publish(self, event: str, data: Dict):
+        if not self.task_id:
+            return
+        self.redis_client.publish(self.channel(self.task_id), json.dumps({'event': event, **data}))
@@ -0,0 +1,44 @@
+from typing import Callable, Optional
+
+
+class ExtractContext:
+    """
+    Everything that belongs to a single extraction call: the progress callback, the page
+    cache and the page records of the task.
+
+    Strategies are shared instances (see `Strategy.get_strategy`) - they get the context as
+    an argument of `extract_text` instead of keeping per-task state, so one instance can
+    serve concurrent tasks in a threads or gevent worker pool.
+    """
+
+    def __init__(self, update_state: Optional[Callable] = None, page_cache=None, progress=None):
+        """
+        Parameters:
+            update_state: Called with `state` and `meta` keywords to report the progress.
+            page_cache: Page level OCR cache (`ResultCache`); None disables it.
+            progress: `ProgressReporter` the extracted pages are recorded and streamed to; None disables it.
+        """
+        self._update_state = update_state
+        self.page_cache = page_cache
+        self.progress = progress
+
+    def update_state(self, state: str, meta: dict):
+        if self._update_state:
+            self._update_state(state=state, meta=meta)
+
+    def add_page(self, page_number: int, pages_total: int, text: str, from_cache: bool = False):
+        if self.progress:
+            self.progress.add_page(page_number, pages_total, text, from_cache)
+
+    def flush(self):
+        """
+        Writes the progress update held back by the throttling, if any (see `ProgressReporter`).
+        """
+        if self.progress:
+            self.progress.flush()
+
+    def without_pages(self) -> "ExtractContext":
+        """
+        Same context, without the page records - for strategies delegating some pages to another one.
+        """
+        return ExtractContext(self._update_state, self.page_cache)
@@ -0,0 +1,73 @@
+import os
+import re
+from typing import List
+
+# Rough estimate for the Latin script - the models' tokenizers are not available here
+CHARS_PER_TOKEN = 4
+
+# Boundaries the text is split on, from the most to the least preferred: blank lines
+# (pages and paragraphs), lines, words
+SPLIT_PATTERNS = (r"\n[ \t]*\n\s*", r"\n", r"[ \t]+")
+JOINERS = ("\n\n", "\n", " ")
+
+# Combines the answers to the same prompt given for consecutive parts of a document
+LLM_MERGE_PROMPT = os.getenv(
+    'LLM_MERGE_PROMPT',
+    "The following texts are the results of the same task done on consecutive parts of one document. "
+    "Merge them into one result of the same format - for JSON, one JSON document with the lists joined "
+    "and the fields combined. Return only the merged result.\n\n")
+
+
+def estimate_tokens(text: str) -> int:
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def split_text(text: str, max_tokens: int) -> List[str]:
+    """
+    Splits the text into consecutive chunks of at most `max_tokens` (estimated) tokens each,
+    on page and paragraph boundaries where possible, then on lines and words. Words longer
+    than a whole chunk are cut.
+    """
+    if max_tokens <= 0:
+        raise ValueError("max_tokens must be positive")
+    return [chunk for chunk in _split(text.strip(), max_tokens * CHARS_PER_TOKEN, 0) if chunk.strip()]
+
+
+def group_chunks(texts: List[str], max_tokens: int) -> List[List[str]]:
+    """
+    Groups consecutive texts so that each group, joined, fits in `max_tokens` (estimated) tokens.
+    Every group but the last one has at least two texts - merging the groups always reduces
+    their number, even when single texts do not fit.
+    """
+    groups = []
+    for text in texts:
+        if groups and (len(groups[-1]) < 2 or estimate_tokens("\n\n".join(groups[-1] + [text])) <= max_tokens):
+            groups[-1].append(text)
+        else:
+            groups.append([text])
+    return groups
+
+
+def _split(text: str, max_chars: int, level: int) -> List[str]:
+    if len(text) <= max_chars:
+        return [text]
+    if level == len(SPLIT_PATTERNS):
+        return [text[start:start + max_chars] for start in range(0, len(text), max_chars)]
+
+    joiner = JOINERS[level]
+    chunks = []
+    current = ''
+    for part in re.split(SPLIT_PATTERNS[level], text):
+        if len(part) > max_chars:
+            if current:
+                chunks.append(current)
+            *full_chunks, current = _split(part, max_chars, level + 1)
+            chunks.extend(full_chunks)
+        elif current and len(current) + len(joiner) + len(part) > max_chars:
+            chunks.append(current)
+            current = part
+        else:
+            current = current + joiner + part if current else part
+    if current:
+        chunks.append(current)
+    return chunks
@@ -0,0 +1,235 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Set, Union
+
+import httpx
+import ollama
+
+
+def normalize_model(model: Optional[str]) -> str:
+    """
+    "llama3.1" and "llama3.1:latest" name the same model.
+    """
+    model = model or ''
+    return model if ':' in model else f"{model}:latest"
+
+
+class OllamaHost:
+    """
+    One Ollama server of the pool, with its health and request statistics.
+    """
+
+    HEALTH_CHECK_TIMEOUT = 5
+
+    def __init__(self, url: str, timeout: Optional[float] = None):
+        self.url = url
+        self.client = ollama.Client(host=url, timeout=timeout)
+        self.check_client = ollama.Client(host=url, timeout=self.HEALTH_CHECK_TIMEOUT)
+        self.healthy = True  # until the first health check says otherwise
+        self.available_models: Set[str] = set()
+        self.loaded_models: Set[str] = set()
+        self.in_flight = 0
+        self.requests = 0
+        self.failures = 0
+        self.total_latency = 0.0
+        self.last_latency = None
+        self.check_latency = None
+        self.last_error = None
+
+    def stats(self) -> Dict:
+        return {
+            'url': self.url,
+            'healthy': self.healthy,
+            'in_flight': self.in_flight,
+            'requests': self.requests,
+            'failures': self.failures,
+            'avg_latency': round(self.total_latency / self.requests, 3) if self.requests else None,
+            'last_latency': round(self.last_latency, 3) if self.last_latency is not None else None,
+            'check_latency': round(self.check_latency, 3) if self.check_latency is not None else None,
+            'loaded_models': sorted(self.loaded_models),
+            'last_error': self.last_error,
+        }
+
+
+class OllamaPool:
+    """
+    Pool of Ollama servers (env `OLLAMA_HOSTS`, comma separated; `OLLAMA_HOST` if not set).
+
+    Every request goes to the healthy host with the fewest requests in flight, preferring
+    hosts which have the model loaded in memory, then hosts which have it pulled. A daemon
+    thread checks the hosts every `health_check_interval` seconds (`/api/ps` and `/api/tags`);
+    hosts failing the check or a request are skipped until they pass a check again.
+    Statistics are kept per process.
+
+    Models registered with `keep_warm` are loaded on every host which has them pulled, and
+    loaded again by the health checks when the host unloads them (e.g. evicted by other models).
+    """
+    CONNECTION_ERRORS = (httpx.TransportError, ConnectionError)
+
+    def __init__(self, urls: List[str], health_check_interval: float = 15, timeout: Optional[float] = None):
+        if not urls:
+            raise ValueError("Ollama pool requires at least one host")
+        self.hosts = [OllamaHost(url, timeout) for url in urls]
+        self.health_check_interval = health_check_interval
+        self._lock = threading.Lock()
+        self._checker_pid = None
+        self._warm_models: Dict[str, Union[str, float]] = {}
+
+    @classmethod
+    def from_env(cls) -> "OllamaPool":
+        urls = os.getenv('OLLAMA_HOSTS') or os.getenv('OLLAMA_HOST') or 'http://localhost:11434'
+        timeout = os.getenv('OLLAMA_TIMEOUT')
+        return cls([url.strip() for url in urls.split(',') if url.strip()],
+                   health_check_interval=float(os.getenv('OLLAMA_HEALTH_CHECK_INTERVAL', 15)),
+                   timeout=float(timeout) if timeout else None)
+
+    @contextmanager
+    def client(self, model: Optional[str] = None) -> Iterator[ollama.Client]:
+        """
+        Client of the host chosen for `model`. The request counts as in flight (and its
+        latency is measured) until the `with` block exits - consume streamed responses in it.
+        """
+        host = self.select(model)
+        start_time = time.time()
+        try:
+            yield host.client
+        except self.CONNECTION_ERRORS as e:
+            self._failed(host, e)
+            raise
+        finally:
+            latency = time.time() - start_time
+            with self._lock:
+                host.in_flight -= 1
+                host.requests += 1
+                host.total_latency += latency
+                host.last_latency = latency
+
+    def select(self, model: Optional[str] = None) -> OllamaHost:
+        self._start_health_checks()
+        model = normalize_model(model) if model else None
+        with self._lock:
+            candidates = [host for host in self.hosts if host.healthy] or self.hosts  # all down - try anyway
+            if model:
+                candidates = ([host for host in candidates if model in host.loaded_models]
+                              or [host for host in candidates if model in host.available_models]
+                              or candidates)
+            host = min(candidates, key=lambda candidate: (candidate.in_flight,
+                                                          candidate.total_latency / (candidate.requests or 1)))
+            host.in_flight += 1
+            return host
+
+    def check(self):
+        """
+        Checks all the hosts once - which are up and which models they have pulled and loaded.
+        """
+        for host in self.hosts:
+            start_time = time.time()
+            try:
+                loaded_models = {normalize_model(model.model) for model in host.check_client.ps().models}
+                available_models = {normalize_model(model.model) for model in host.check_client.list().models}
+            except Exception as e:
+                self._failed(host, e)
+                continue
+
+            with self._lock:
+                host.healthy = True
+                host.loaded_models = loaded_models
+                host.available_models = available_models
+                host.check_latency = time.time() - start_time
+
+    def keep_warm(self, model: str, keep_alive: Union[str, float, None] = None):
+        """
+        Keeps the model loaded on the hosts, for `keep_alive` after the last request (Ollama
+        duration, e.g. "30m"; -1 - until the host is stopped; None - the host default).
+        Loading is done by the health check thread, so it does not block the caller; when
+        the health checks are disabled, the model is loaded right away.
+        """
+        with self._lock:
+            self._warm_models[normalize_model(model)] = keep_alive
+        if self.health_check_interval:
+            self._start_health_checks()
+        else:
+            self.check()
+            self.load_warm_models()
+
+    def load_warm_models(self):
+        """
+        Loads the `keep_warm` models on the healthy hosts which have them pulled but not loaded.
+        """
+        with self._lock:
+            missing = [(host, model, keep_alive) for host in self.hosts if host.healthy
+                       for model, keep_alive in self._warm_models.items()
+                       if model in host.available_models and model not in host.loaded_models]
+        for host, model, keep_alive in missing:
+            print(f"Loading Ollama model {model} on {host.url} (keep_alive={keep_alive})")
+            start_time = time.time()
+            try:
+                # A request without a prompt just loads the model
+                host.client.generate(model, keep_alive=keep_alive)
+            except ollama.ResponseError as e:
+                print(f"Failed to load Ollama model {model} on {host.url}: {e.error}")
+                continue
+            except self.CONNECTION_ERRORS as e:
+                self._failed(host, e)
+                continue
+            print(f"Loaded Ollama model {model} on {host.url} in {time.time() - start_time:.1f}s")
+            with self._lock:
+                host.loaded_models.add(model)
+
+    def resident(self, model: str) -> List[str]:
+        """
+        URLs of the healthy hosts which have the model loaded, as of the last check.
+        """
+        model = normalize_model(model)
+        with self._lock:
+            return [host.url for host in self.hosts if host.healthy and model in host.loaded_models]
+
+    def stats(self) -> List[Dict]:
+        with self._lock:
+            return [host.stats() for host in self.hosts]
+
+    def pull(self, model: str) -> List[Dict]:
+        """
+        Pulls the model on every host, so requests for it can go to any of them.
+        """
+        return [host.client.pull(model) for host in self.hosts]
+
+    def _failed(self, host: OllamaHost, error: Exception):
+        print(f"Ollama host {host.url} failed: {error}")
+        with self._lock:
+            host.healthy = False
+            host.failures += 1
+            host.last_error = str(error)
+
+    def _start_health_checks(self):
+        # One checker thread per process - worker processes do not inherit threads
+        if self._checker_pid == os.getpid() or not self.health_check_interval:
+            return
+        with self._lock:
+            if self._checker_pid == os.getpid():
+                return
+            self._checker_pid = os.getpid()
+        threading.Thread(target=self._health_check_loop, name="ollama-health-check", daemon=True).start()
+
+    def _health_check_loop(self):
+        while True:
+            self.check()
+            self.load_warm_models()
+            time.sleep(self.health_check_interval)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def ollama_pool() -> OllamaPool:
+    """
+    The process wide pool, created from the environment on first use.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = OllamaPool.from_env()
+        return _pool
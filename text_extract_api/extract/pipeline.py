@@ -0,0 +1,53 @@
+from typing import Dict, Optional
+
+from celery import Signature, chain
+
+from text_extract_api.celery_app import app as celery_app, EXTRACT_TASK, LLM_TASK, STORE_TASK
+
+
+def ocr_pipeline(
+        blob_ref: str,
+        strategy_name: str,
+        filename: str,
+        file_hash: str,
+        ocr_cache: bool,
+        prompt: Optional[str] = None,
+        model: Optional[str] = None,
+        language: Optional[str] = None,
+        storage_profile: Optional[str] = None,
+        storage_filename: Optional[str] = None,
+        llm_cache: bool = True,
+        single_flight_key: Optional[str] = None,
+        job_id: Optional[str] = None,
+        pages_per_task: int = 0,
+        llm_chunk_tokens: int = 0,
+        llm_reduce: str = 'concat',
+        single_pass: bool = False,
+        json_schema: Optional[Dict] = None,
+) -> Signature:
+    """
+    Celery chain of the stages needed for the request: extract -> LLM (with a prompt only) ->
+    store (with a storage profile only). Each stage task is routed to its own queue (see
+    `celery_app`), so OCR, LLM and storage workers are scaled independently. The stages are
+    referred to by name - building the chain does not import `text_extract_api.extract.tasks`.
+
+    Apply it with `task_id=job_id` - the last stage then gets the job id, so its result is
+    the job result, and all stages report their progress under that id. `pages_per_task`
+    enables the page fan-out of large PDFs (see `extract_task`), `llm_chunk_tokens` the chunked
+    LLM stage for long texts (see `llm_task`). With `single_pass`, the prompt (and `json_schema`)
+    goes to the extract stage and there is no LLM stage.
+    """
+    job = {'id': job_id, 'single_flight_key': single_flight_key}
+    single_pass = single_pass and bool(prompt)
+    extract_args = [blob_ref, strategy_name, file_hash, ocr_cache, language, pages_per_task]
+    if single_pass:
+        extract_args += [prompt, json_schema, llm_cache]
+    stages = [celery_app.signature(EXTRACT_TASK, args=extract_args, kwargs={'job': job}, immutable=True)]
+    if prompt and not single_pass:
+        stages.append(celery_app.signature(LLM_TASK, args=[prompt, model, llm_cache, llm_chunk_tokens, llm_reduce],
+                                           kwargs={'job': job}))
+    if storage_profile:
+        stages.append(celery_app.signature(STORE_TASK, args=[filename, storage_profile, storage_filename],
+                                           kwargs={'job': job}))
+
+    return chain(*stages)
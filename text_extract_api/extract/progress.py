@@ -0,0 +1,115 @@
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+import redis
+
+from text_extract_api.extract.events import TaskEvents
+
+
+class ProgressReporter:
+    """
+    Throttled progress reporting for a single task.
+
+    `update` forwards the task state to the Celery result backend only when the state
+    changes, the progress moved by at least `min_step` percent or `min_interval` seconds
+    passed since the last write - intermediate updates are coalesced into the latest one.
+    The text of extracted pages is not part of the state; every page is appended as its
+    own record to a Redis list (see `pages`), so the state stays small and clients fetch
+    only the pages they have not seen yet.
+    """
+
+    def __init__(self, update_state: Optional[Callable], redis_client: redis.Redis, task_id: Optional[str],
+                 min_interval: Optional[float] = None, min_step: Optional[int] = None,
+                 pages_ttl: Optional[int] = None, page_offset: int = 0, pages_total: Optional[int] = None):
+        """
+        `page_offset` and `pages_total` translate page numbers reported for a part of the
+        document (e.g. a page range processed by its own task) to the whole document.
+        """
+        self.update_state = update_state
+        self.redis_client = redis_client
+        self.task_id = task_id
+        self.events = TaskEvents(redis_client, task_id)
+        self.min_interval = min_interval if min_interval is not None else float(
+            os.getenv('PROGRESS_MIN_INTERVAL', 1.0))
+        self.min_step = min_step if min_step is not None else int(os.getenv('PROGRESS_MIN_STEP', 5))
+        self.pages_ttl = pages_ttl or int(os.getenv('PROGRESS_PAGES_TTL', 24 * 3600))
+        self.page_offset = page_offset
+        self.pages_total = pages_total
+        self._last_state = None
+        self._last_progress = None
+        self._last_time = 0.0
+        self._pending = None
+        self._lock = threading.Lock()  # updated from the page threads of the strategies too
+
+    @staticmethod
+    def pages_key(task_id: str) -> str:
+        return f"ocr:pages:{task_id}"
+
+    @classmethod
+    def pages(cls, redis_client: redis.Redis, task_id: str, start: int = 0) -> List[Dict]:
+        """
+        Page records of the task, starting from the `start`-th record (0 - all of them).
+        """
+        return [json.loads(record) for record in redis_client.lrange(cls.pages_key(task_id), start, -1)]
+
+    def update(self, state: str, meta: Dict, force: bool = False):
+        progress = self._progress(meta)
+        with self._lock:
+            if (
+                    force
+                    or state != self._last_state
+                    or self._last_progress is None
+                    or abs(progress - self._last_progress) >= self.min_step
+                    or time.time() - self._last_time >= self.min_interval
+            ):
+                self._write(state, meta, progress)
+            else:
+                self._pending = (state, meta)
+
+    def flush(self):
+        """
+        Writes the last coalesced update, if any.
+        """
+        with self._lock:
+            if self._pending:
+                state, meta = self._pending
+                self._write(state, meta, self._progress(meta))
+
+    def add_page(self, page_number: int, pages_total: int, text: str, from_cache: bool = False):
+        record = {'page': self.page_offset + page_number, 'pages_total': self.pages_total or pages_total,
+                  'text': text, 'from_cache': from_cache}
+        if self.task_id:
+            pipeline = self.redis_client.pipeline()
+            pipeline.rpush(self.pages_key(self.task_id), json.dumps(record))
+            pipeline.expire(self.pages_key(self.task_id), self.pages_ttl)
+            pipeline.execute()
+        self.events.publish('page', record)
+
+    def count_pages_done(self, count: int) -> int:
+        """
+        Adds `count` pages to the pages done by all tasks working on this task's document.
+        """
+        key = f"ocr:pages_done:{self.task_id}"
+        pipeline = self.redis_client.pipeline()
+        pipeline.incrby(key, count)
+        pipeline.expire(key, self.pages_ttl)
+        return pipeline.execute()[0]
+
+    def _write(self, state: str, meta: Dict, progress: int):
+        # Called with the lock held - a newer update is never overwritten by an older one
+        if self.update_state:
+            self.update_state(state=state, meta=meta)
+        self._last_state = state
+        self._last_progress = progress
+        self._last_time = time.time()
+        self._pending = None
+
+    @staticmethod
+    def _progress(meta: Dict) -> int:
+        try:
+            return int(meta.get('progress', 0))
+        except (TypeError, ValueError):
+            return 0
@@ -0,0 +1,54 @@
+import os
+from hashlib import md5
+from typing import Optional, Tuple
+
+import redis
+
+
+class SingleFlight:
+    """
+    Registry of in-flight tasks used to deduplicate concurrent identical requests.
+
+    The first submission registers its task id under the request key; submissions with
+    the same key made while it is running get that task id back and share its result
+    instead of starting new work. Entries are released by the worker once the task has
+    finished and expire after `ttl` seconds in case the worker dies.
+    """
+
+    # Deletes the key only if it still holds the task id - in one step, so a registration made
+    # by a new job after the entry expired is never removed
+    RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+    def __init__(self, redis_client: redis.Redis, ttl: Optional[int] = None):
+        self.redis_client = redis_client
+        self.ttl = ttl or int(os.getenv('OCR_INFLIGHT_TTL', 3600))
+        self._release = redis_client.register_script(self.RELEASE_SCRIPT)
+
+    @staticmethod
+    def key(*parts) -> str:
+        digest = md5(":".join(str(part) for part in parts).encode('utf-8')).hexdigest()
+        return f"inflight:{digest}"
+
+    def acquire(self, key: str, task_id: str) -> Tuple[str, bool]:
+        """
+        Registers `task_id` under `key` unless another task is already running for it.
+
+        Returns:
+            The task id to use and whether the request was coalesced with a running task.
+        """
+        while True:
+            if self.redis_client.set(key, task_id, nx=True, ex=self.ttl):
+                return task_id, False
+
+            running_task_id = self.redis_client.get(key)
+            if running_task_id is not None:
+                return running_task_id.decode('utf-8'), True
+            # released in the meantime - try to register again
+
+    def release(self, key: str, task_id: str):
+        self._release(keys=[key], args=[task_id])
@@ -1,20 +1,148 @@
 import io
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
 import numpy as np
 from PIL import Image
-import easyocr
 
-from extract.extract_result import ExtractResult
+from text_extract_api.extract.extract_result import ExtractResult
+from text_extract_api.extract.extract_context import ExtractContext
 from text_extract_api.extract.strategies.strategy import Strategy
 from text_extract_api.files.file_formats.file_format import FileFormat
 from text_extract_api.files.file_formats.image import ImageFileFormat
 
 
+class ReaderPool:
+    """
+    Per-process LRU pool of `easyocr.Reader` instances.
+
+    Building a Reader loads the detector and recognizer weights from disk, which takes
+    seconds and a lot of memory, so readers are kept resident and shared between tasks.
+    Readers are keyed by the normalized language set ("de,en" and "en, de" share one
+    reader) and the least recently used one is dropped once `max_size` is exceeded.
+
+    Readers are loaded outside of the pool lock - threads needing readers already loaded
+    are not blocked by a load, and threads needing the one being loaded wait for it.
+    """
+
+    def __init__(self, max_size: int = 2, reader_factory: Optional[Callable[[List[str]], Any]] = None):
+        if max_size < 1:
+            raise ValueError("EasyOCR reader pool size must be at least 1.")
+
+        self.max_size = max_size
+        self.reader_factory = reader_factory or self._load_reader
+        self._readers: "OrderedDict[Tuple[str, ...], Any]" = OrderedDict()
+        self._loading: Dict[Tuple[str, ...], threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.load_time = 0.0
+
+    @staticmethod
+    def normalize_languages(language: str) -> Tuple[str, ...]:
+        languages = {lang.strip() for lang in language.split(',') if lang.strip()}
+        if not languages:
+            raise ValueError("EasyOCR - at least one language is required.")
+        return tuple(sorted(languages))
+
+    @staticmethod
+    def _load_reader(languages: List[str]) -> "easyocr.Reader":
+        import easyocr  # loads torch - only in the workers using this strategy
+        return easyocr.Reader(languages)
+
+    def get(self, language: str) -> "easyocr.Reader":
+        key = self.normalize_languages(language)
+
+        with self._lock:
+            reader = self._cached(key)
+            if reader is not None:
+                return reader
+            loading_lock = self._loading.setdefault(key, threading.Lock())
+
+        with loading_lock:
+            with self._lock:
+                reader = self._cached(key)  # loaded by another thread in the meantime
+                if reader is not None:
+                    return reader
+                self.misses += 1
+
+            start_time = time.time()
+            try:
+                reader = self.reader_factory(list(key))
+            except Exception:
+                with self._lock:
+                    self._loading.pop(key, None)
+                raise
+            elapsed_time = time.time() - start_time
+
+            with self._lock:
+                self._loading.pop(key, None)
+                self.load_time += elapsed_time
+                self._readers[key] = reader
+                while len(self._readers) > self.max_size:
+                    self._readers.popitem(last=False)
+                    self.evictions += 1
+
+        print(f"EasyOCR reader {','.join(key)} loaded in {elapsed_time:.2f}s {self.stats()}")
+        return reader
+
+    def _cached(self, key: Tuple[str, ...]) -> Optional[Any]:
+        # Called with the pool lock held
+        reader = self._readers.get(key)
+        if reader is not None:
+            self._readers.move_to_end(key)
+            self.hits += 1
+        return reader
+
+    def warm_up(self, languages: Iterable[str]):
+        for language in languages:
+            self.get(language)
+
+    def stats(self) -> Dict:
+        return {
+            'size': len(self._readers),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'load_time': round(self.load_time, 3),
+        }
+
+
 class EasyOCRStrategy(Strategy):
+    DEFAULT_READER_POOL_SIZE = 2
+
+    def __init__(self):
+        super().__init__()
+        self._reader_pool = None
+        self._reader_pool_lock = threading.Lock()
+        self._readtext_lock = threading.Lock()
+
     @classmethod
     def name(cls) -> str:
         return "easyOCR"
 
-    def extract_text(self, file_format: FileFormat, language: str = 'en') -> ExtractResult:
+    @property
+    def reader_pool(self) -> ReaderPool:
+        with self._reader_pool_lock:
+            if self._reader_pool is None:
+                config = self._strategy_config or {}
+                self._reader_pool = ReaderPool(config.get('reader_pool_size', self.DEFAULT_READER_POOL_SIZE))
+            return self._reader_pool
+
+    def warm_up(self):
+        """
+        Preloads readers for the language sets listed under `warm_up_languages`
+        in the strategy config, so the first task does not pay the model load time.
+        """
+        config = self._strategy_config or {}
+        self.reader_pool.warm_up(config.get('warm_up_languages') or [])
+
+    def extract_text(self, file_format: FileFormat, language: str = 'en',
+                     context: Optional[ExtractContext] = None) -> ExtractResult:
         """
         Extract text using EasyOCR after converting the input file to images
         (if not already an ImageFileFormat). 
@@ -29,31 +157,30 @@ class EasyOCRStrategy(Strategy):
                 f"EasyOCR - format {file_format.mime_type} is not supported (yet?)"
             )
 
-        # Convert the input file to a list of ImageFileFormat objects
-        images = FileFormat.convert_to(file_format, ImageFileFormat)
+        # Pages are rasterized lazily and looked up in the page cache one by one -
+        # OCR starts on the first page while the next ones are still being rasterized
+        all_extracted_text = self.extract_pages(file_format, language, context)
 
-        # Initialize the EasyOCR Reader
-        # Add or change languages to your needs, e.g., ['en', 'fr']
-        reader = easyocr.Reader(language.split(','))
+        # Join text from all images/pages
+        full_text = "\n\n".join(all_extracted_text)
 
-        # Process each image, extracting text
-        all_extracted_text = []
-        for image_format in images:
-            # Convert the in-memory bytes to a PIL Image
-            pil_image = Image.open(io.BytesIO(image_format.binary))
-            
-            # Convert PIL image to numpy array for EasyOCR
-            np_image = np.array(pil_image)
+        return ExtractResult.from_text(full_text)
 
-            # Perform OCR; with `detail=0`, we get just text, no bounding boxes
-            ocr_result = reader.readtext(np_image, detail=0) # TODO: addd bounding boxes support as described in #37
+    def extract_page(self, image: FileFormat, language: str = 'en', page_number: int = 1,
+                     num_pages: int = 1, context: Optional[ExtractContext] = None) -> str:
+        # Reuse the EasyOCR Reader for this language set, e.g. 'en,fr'
+        reader = self.reader_pool.get(language)
 
-            # Combine all lines into a single string for that image/page
-            extracted_text = "\n".join(ocr_result)
-            all_extracted_text.append(extracted_text)
+        # Convert the in-memory bytes to a PIL Image
+        pil_image = Image.open(io.BytesIO(image.binary))
 
-        # Join text from all images/pages
-        full_text = "\n\n".join(all_extracted_text)
+        # Convert PIL image to numpy array for EasyOCR
+        np_image = np.array(pil_image)
 
+        # Perform OCR; with `detail=0`, we get just text, no bounding boxes
+        # Readers are not thread-safe - in a threads pool the pages are OCRed one at a time
+        with self._readtext_lock:
+            ocr_result = reader.readtext(np_image, detail=0) # TODO: addd bounding boxes support as described in #37
 
-        return ExtractResult.from_text(full_text)
+        # Combine all lines into a single string for that image/page
+        return "\n".join(ocr_result)
@@ -1,10 +1,16 @@
-import os
-import tempfile
+import re
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Dict, List, Optional, Union
 
 import ollama
 
-from extract.extract_result import ExtractResult
+from text_extract_api.extract.extract_result import ExtractResult
+from text_extract_api.extract.extract_context import ExtractContext
+from text_extract_api.extract.llm_chunks import LLM_MERGE_PROMPT
+from text_extract_api.extract.ollama_pool import ollama_pool
 from text_extract_api.extract.strategies.strategy import Strategy
 from text_extract_api.files.file_formats.file_format import FileFormat
 from text_extract_api.files.file_formats.image import ImageFileFormat
@@ -12,60 +18,137 @@ from text_extract_api.files.file_formats.image import ImageFileFormat
 
 class OllamaStrategy(Strategy):
     """Ollama models OCR strategy"""
+    PAGE_SEPARATOR = "<<<PAGE BREAK>>>"
 
     @classmethod
     def name(cls) -> str:
         return "llama_vision"
 
-    def extract_text(self, file_format: FileFormat, language: str = 'en') -> ExtractResult:
+    def warm_up(self):
+        """
+        Loads the model on the Ollama hosts when `warm_up` is set in the strategy config,
+        and keeps it loaded - see `OllamaPool.keep_warm`.
+        """
+        config = self._strategy_config or {}
+        if config.get('warm_up'):
+            ollama_pool().keep_warm(config.get('model'), config.get('keep_alive'))
 
-        if (
-                not isinstance(file_format, ImageFileFormat)
-                and not file_format.can_convert_to(ImageFileFormat)
-        ):
-            raise TypeError(
-                f"Ollama OCR - format {file_format.mime_type} is not supported (yet?)"
-            )
+    def extract_text(self, file_format: FileFormat, language: str = 'en',
+                     context: Optional[ExtractContext] = None) -> ExtractResult:
+        self._check_format(file_format)
+
+        config = self._strategy_config or {}
+        extracted_text = "".join(self.extract_pages(file_format, language, context,
+                                                    concurrency=int(config.get('page_concurrency', 1)),
+                                                    batch_size=int(config.get('pages_per_request', 1))))
+
+        return ExtractResult.from_text(extracted_text)
+
+    def extract_structured(self, file_format: FileFormat, prompt: str, output_format: Optional[Union[str, Dict]] = None,
+                           language: str = 'en', context: Optional[ExtractContext] = None) -> ExtractResult:
+        """
+        Sends the prompt with the page images straight to the vision model; `output_format` is
+        passed as the Ollama `format`, constraining the answer to the JSON schema. All the pages
+        go in one request; documents with more pages than `single_pass_pages` (0 - no limit) are
+        answered part by part (`page_concurrency` parts at once) and the answers merged by the
+        model into one, in the same format.
+        """
+        self._check_format(file_format)
+        context = context or ExtractContext()
+        config = self._strategy_config or {}
+        concurrency = max(1, int(config.get('page_concurrency', 1)))
+
+        # The pages are rasterized as the parts are sent - at most `concurrency` parts are kept in memory
+        num_pages = file_format.page_count()
+        batch_size = max(1, int(config.get('single_pass_pages') or 0) or num_pages)
+        images = file_format.convert_to_iterator(ImageFileFormat)
+        answers = []
+        in_flight = deque()
+        first_page_number = 1
+        with ThreadPoolExecutor(concurrency, thread_name_prefix=self.name()) as executor:
+            while part := list(islice(images, batch_size)):
+                if len(in_flight) >= concurrency:
+                    answers.append(in_flight.popleft().result())
+                in_flight.append(executor.submit(self._chat, prompt, part, first_page_number, num_pages, context,
+                                                 output_format))
+                first_page_number += len(part)
+            answers.extend(future.result() for future in in_flight)
+
+        if len(answers) == 1:
+            return ExtractResult.from_text(answers[0])
+
+        print(f"Ollama single pass - merging {len(answers)} answers from {config.get('model')}")
+        return ExtractResult.from_text(self._chat(LLM_MERGE_PROMPT + "\n\n".join(answers), [], num_pages, num_pages,
+                                                  context, output_format))
 
-        images = FileFormat.convert_to(file_format, ImageFileFormat)
+    def extract_page(self, image: FileFormat, language: str = 'en', page_number: int = 1,
+                     num_pages: int = 1, context: Optional[ExtractContext] = None) -> str:
+        return self._chat(self._strategy_config.get('prompt'), [image], page_number, num_pages, context)
+
+    def extract_page_batch(self, images: List[FileFormat], language: str = 'en', first_page_number: int = 1,
+                           num_pages: int = 1, context: Optional[ExtractContext] = None) -> List[str]:
+        """
+        Sends all the page images in one chat request, asking the model to separate the pages
+        with `PAGE_SEPARATOR`. If the answer cannot be split into one text per page, the pages
+        are extracted again one by one.
+        """
+        prompt = (f"{self._strategy_config.get('prompt')}\n\n"
+                  f"The {len(images)} images are consecutive pages of one document. Convert every page on its own, "
+                  f"in the order of the images, and separate the pages with a line containing only "
+                  f"{self.PAGE_SEPARATOR}")
+        extracted_text = self._chat(prompt, images, first_page_number, num_pages, context)
+
+        pages_text = [page_text.strip('\n') for page_text in
+                      re.split(rf"^[ \t]*{re.escape(self.PAGE_SEPARATOR)}[ \t]*$", extracted_text, flags=re.MULTILINE)]
+        if len(pages_text) == len(images):
+            return pages_text
+
+        print(f"Ollama OCR - expected {len(images)} pages from {self._strategy_config.get('model')}, "
+              f"got {len(pages_text)} - extracting pages {first_page_number}-{first_page_number + len(images) - 1} "
+              f"one by one")
+        return super().extract_page_batch(images, language, first_page_number, num_pages, context)
+
+    def _chat(self, prompt: str, images: List[FileFormat], first_page_number: int, num_pages: int,
+              context: Optional[ExtractContext], output_format: Optional[Union[str, Dict]] = None) -> str:
+        context = context or ExtractContext()
         extracted_text = ""
         start_time = time.time()
-        ocr_percent_done = 0
-        num_pages = len(images)
-        for i, image in enumerate(images):
-
-            with tempfile.NamedTemporaryFile(suffix=".jpg", delete=False) as temp_file:
-                temp_file.write(image.binary)
-                temp_filename = temp_file.name
-
-            print(self._strategy_config)
-            # Generate text using the specified model
-            try:
-                response = ollama.chat(self._strategy_config.get('model'), [{
+        ocr_percent_done = int(20 * (first_page_number - 1) / num_pages)  # 20% of work is for OCR - just a stupid assumption from tasks.py
+        last_page_number = first_page_number + len(images) - 1
+        pages = str(first_page_number) if len(images) <= 1 else f'{first_page_number}-{last_page_number}'
+
+        # Generate text using the specified model - page images are sent as bytes, straight from memory
+        try:
+            with ollama_pool().client(self._strategy_config.get('model')) as client:
+                response = client.chat(self._strategy_config.get('model'), [{
                     'role': 'user',
-                    'content': self._strategy_config.get('prompt'),
-                    'images': [temp_filename]
-                }], stream=True)
-                os.remove(temp_filename)
+                    'content': prompt,
+                    'images': [image.binary for image in images]
+                }], stream=True, format=output_format, keep_alive=self._strategy_config.get('keep_alive'))
                 num_chunk = 1
                 for chunk in response:
                     meta = {
                         'progress': str(30 + ocr_percent_done),
                         'status': 'OCR Processing'
-                                  + '(page ' + str(i + 1) + ' of ' + str(num_pages) + ')'
+                                  + '(page ' + pages + ' of ' + str(num_pages) + ')'
                                   + ' chunk no: ' + str(num_chunk),
                         'start_time': start_time,
                         'elapsed_time': time.time() - start_time}
-                    self.update_state_callback(state='PROGRESS', meta=meta)
+                    context.update_state(state='PROGRESS', meta=meta)
                     num_chunk += 1
                     extracted_text += chunk['message']['content']
+        except ollama.ResponseError as e:
+            print('Error:', e.error)
+            raise Exception("Failed to generate text with Ollama model " + self._strategy_config.get('model'))
 
-                ocr_percent_done += int(
-                    20 / num_pages)  # 20% of work is for OCR - just a stupid assumption from tasks.py
-            except ollama.ResponseError as e:
-                print('Error:', e.error)
-                raise Exception("Failed to generate text with Ollama model " + self._strategy_config.get('model'))
-
-            print(response)
+        return extracted_text
 
-        return ExtractResult.from_text(extracted_text)
+    @staticmethod
+    def _check_format(file_format: FileFormat):
+        if (
+                not isinstance(file_format, ImageFileFormat)
+                and not file_format.can_convert_to(ImageFileFormat)
+        ):
+            raise TypeError(
+                f"Ollama OCR - format {file_format.mime_type} is not supported (yet?)"
+            )
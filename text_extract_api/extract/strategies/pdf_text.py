@@ -0,0 +1,83 @@
+import time
+from typing import Iterator, List, Optional, Tuple
+
+from pdftext.extraction import paginated_plain_text_output
+
+from text_extract_api.extract.extract_context import ExtractContext
+from text_extract_api.extract.extract_result import ExtractResult
+from text_extract_api.extract.strategies.strategy import Strategy
+from text_extract_api.files.converters.pdf_to_jpeg import PdfToJpegConverter
+from text_extract_api.files.file_formats.file_format import FileFormat
+from text_extract_api.files.file_formats.pdf import PdfFileFormat
+
+
+class PdfTextStrategy(Strategy):
+    """
+    Embedded text layer strategy for born-digital PDFs.
+
+    Text is read straight from the PDF with `pdftext`. Pages without a usable text layer
+    (scans, pictures) are rasterized and sent to the `ocr_strategy` from the config,
+    so only those pages pay the OCR price.
+    """
+    DEFAULT_OCR_STRATEGY = 'easyocr'
+    DEFAULT_MIN_CHARS_PER_PAGE = 32
+
+    @classmethod
+    def name(cls) -> str:
+        return "pdf_text"
+
+    def extract_text(self, file_format: FileFormat, language: str = 'en',
+                     context: Optional[ExtractContext] = None) -> ExtractResult:
+        context = context or ExtractContext()
+        if not isinstance(file_format, PdfFileFormat):
+            # Images and other formats have no text layer - OCR them as a whole
+            return self._ocr_strategy().extract_text(file_format, language, context)
+
+        start_time = time.time()
+        pages_text = paginated_plain_text_output(file_format.binary)
+        image_only_pages = [
+            page_number for page_number, page_text in enumerate(pages_text, start=1)
+            if self._is_image_only(page_text)
+        ]
+
+        context.update_state(state='PROGRESS', meta={
+            'progress': 30,
+            'status': f'Text layer extracted, OCR of {len(image_only_pages)} of {len(pages_text)} pages',
+            'start_time': start_time,
+            'elapsed_time': time.time() - start_time})
+
+        if image_only_pages:
+            ocr_strategy = self._ocr_strategy()
+            ocr_context = context.without_pages()  # pages are recorded below, in the document order
+            for page_number, page_image in self._rasterize(file_format, image_only_pages):
+                pages_text[page_number - 1] = ocr_strategy.extract_text(page_image, language, ocr_context).text
+
+        for page_number, page_text in enumerate(pages_text, start=1):
+            context.add_page(page_number, len(pages_text), page_text)
+
+        return ExtractResult.from_text("\n\n".join(pages_text))
+
+    def _is_image_only(self, page_text: str) -> bool:
+        config = self._strategy_config or {}
+        min_chars = config.get('min_chars_per_page', self.DEFAULT_MIN_CHARS_PER_PAGE)
+        return sum(1 for char in page_text if char.isalnum()) < min_chars
+
+    def _ocr_strategy(self) -> Strategy:
+        config = self._strategy_config or {}
+        return Strategy.get_strategy(config.get('ocr_strategy') or self.DEFAULT_OCR_STRATEGY)
+
+    @staticmethod
+    def _rasterize(file_format: PdfFileFormat, page_numbers: List[int]) -> Iterator[Tuple[int, FileFormat]]:
+        """
+        Rasterizes only the given pages, rendering consecutive pages in one pass.
+        """
+        ranges = []
+        for page_number in page_numbers:
+            if ranges and ranges[-1][1] == page_number - 1:
+                ranges[-1][1] = page_number
+            else:
+                ranges.append([page_number, page_number])
+
+        for first_page, last_page in ranges:
+            pages = PdfToJpegConverter.convert_pages(file_format, first_page=first_page, last_page=last_page)
+            yield from zip(range(first_page, last_page + 1), pages)
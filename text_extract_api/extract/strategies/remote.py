@@ -1,24 +1,50 @@
 import os
-import tempfile
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Optional, Tuple
 
-from extract.extract_result import ExtractResult
+from text_extract_api.extract.extract_result import ExtractResult
 
+from text_extract_api.extract.extract_context import ExtractContext
 from text_extract_api.extract.strategies.strategy import Strategy
 from text_extract_api.files.file_formats.file_format import FileFormat
 from text_extract_api.files.file_formats.image import ImageFileFormat
 from text_extract_api.files.file_formats.pdf import PdfFileFormat
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 
 class RemoteStrategy(Strategy):
-    """Remote API Strategy"""
+    """
+    Remote API Strategy - posts the PDF to a marker compatible endpoint.
+
+    Requests go through one pooled HTTP session per worker process (keep-alive, `timeout`,
+    `retries` with exponential `retry_backoff` on connection errors and 429/5xx responses;
+    read timeouts only with `read_retries`).
+    With `pages_per_request`, larger PDFs are split into page ranges posted `page_concurrency`
+    at once and the outputs are put back together in page order.
+    """
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+    def __init__(self):
+        super().__init__()
+        self._session = None
+        self._session_pid = None
+        self._session_lock = threading.Lock()
 
     @classmethod
     def name(cls) -> str:
         return "remote"
 
-    def extract_text(self, file_format: FileFormat, language: str = 'en') -> ExtractResult:
+    def set_strategy_config(self, config: Dict):
+        super().set_strategy_config(config)
+        self._session = None  # timeouts and retries may have changed
+
+    def extract_text(self, file_format: FileFormat, language: str = 'en',
+                     context: Optional[ExtractContext] = None) -> ExtractResult:
+        context = context or ExtractContext()
 
         if (
                 not isinstance(file_format, PdfFileFormat)
@@ -28,44 +54,94 @@ class RemoteStrategy(Strategy):
                 f"Marker PDF - format {file_format.mime_type} is not supported (yet?)"
             )
 
-        pdf_files = FileFormat.convert_to(file_format, PdfFileFormat)
-        extracted_text = ""
+        pdf_file = next(file_format.convert_to_iterator(PdfFileFormat), None)
         start_time = time.time()
-        ocr_percent_done = 0
-        
-        if len(pdf_files) > 1:
-            raise ValueError("Only one PDF file is supported.")
-        
-        if len(pdf_files) == 0:
+
+        if pdf_file is None:
             raise ValueError("No PDF file found - conversion error.")
 
-        try: 
-            url = os.getenv("REMOTE_API_URL", self._strategy_config.get("url"))
-            if not url:
-                raise Exception('Please do set the REMOTE_API_URL environment variable: export REMOTE_API_URL=http://...')
-            files = {'file': ('document.pdf', pdf_files[0].binary, 'application/pdf')}
-            data = {
-                'page_range': None,
-                'languages': language,
-                'force_ocr': False,
-                'paginate_output': False,
-                'output_format': 'markdown' # TODO: support JSON output format
-            }
-
-            meta = {
-                'progress': str(30 + ocr_percent_done),
-                'status': 'OCR Processing',
-                'start_time': start_time,
-                'elapsed_time': time.time() - start_time}
-            self.update_state_callback(state='PROGRESS', meta=meta)
-
-            response = requests.post(url, files=files, data=data)
-            if response.status_code != 200:
-                raise Exception(f"Failed to upload PDF file: {response.content}")
-
-            extracted_text = response.json().get('output', '')
+        url = os.getenv("REMOTE_API_URL", self._strategy_config.get("url"))
+        if not url:
+            raise Exception('Please do set the REMOTE_API_URL environment variable: export REMOTE_API_URL=http://...')
+
+        config = self._strategy_config or {}
+        pages_per_request = int(config.get('pages_per_request') or 0)
+        num_pages = pdf_file.page_count() if pages_per_request else 0
+        if num_pages > pages_per_request:
+            parts = [(first_page, min(first_page + pages_per_request - 1, num_pages))
+                     for first_page in range(1, num_pages + 1, pages_per_request)]
+        else:
+            parts = [None]  # the whole document at once
+
+        context.update_state(state='PROGRESS', meta={
+            'progress': 30,
+            'status': 'OCR Processing' if len(parts) == 1 else f'OCR Processing ({len(parts)} page ranges)',
+            'start_time': start_time,
+            'elapsed_time': time.time() - start_time})
+
+        try:
+            outputs = [None] * len(parts)
+            concurrency = max(1, min(int(config.get('page_concurrency', 1)), len(parts)))
+            with ThreadPoolExecutor(concurrency, thread_name_prefix=self.name()) as executor:
+                futures = {executor.submit(self._post, url, pdf_file, part, language): index
+                           for index, part in enumerate(parts)}
+                for done, future in enumerate(as_completed(futures), start=1):
+                    outputs[futures[future]] = future.result()
+                    if len(parts) > 1:
+                        context.update_state(state='PROGRESS', meta={
+                            'progress': str(30 + int(20 * done / len(parts))),
+                            'status': f'OCR Processing (page range {done} of {len(parts)})',
+                            'start_time': start_time,
+                            'elapsed_time': time.time() - start_time})
         except Exception as e:
             print('Error:', e)
             raise Exception("Failed to generate text with Remote API. Make sure the remote server is up and running")
-            
-        return ExtractResult.from_text(extracted_text)
+
+        return ExtractResult.from_text("\n\n".join(outputs))
+
+    def _post(self, url: str, pdf_file: PdfFileFormat, page_range: Optional[Tuple[int, int]], language: str) -> str:
+        if page_range:
+            pdf_file = pdf_file.split(*page_range)
+        files = {'file': ('document.pdf', pdf_file.binary, 'application/pdf')}
+        data = {
+            'page_range': None,
+            'languages': language,
+            'force_ocr': False,
+            'paginate_output': False,
+            'output_format': 'markdown' # TODO: support JSON output format
+        }
+
+        config = self._strategy_config or {}
+        response = self.session().post(url, files=files, data=data,
+                                       timeout=(float(config.get('connect_timeout', 10)),
+                                                float(config.get('timeout', 600))))
+        if response.status_code != 200:
+            pages = f" (pages {page_range[0]}-{page_range[1]})" if page_range else ""
+            raise Exception(f"Failed to upload PDF file{pages}: {response.content}")
+
+        return response.json().get('output', '')
+
+    def session(self) -> requests.Session:
+        """
+        HTTP session of this process - connections are not shared with forked processes.
+        """
+        if self._session is None or self._session_pid != os.getpid():
+            with self._session_lock:
+                if self._session is None or self._session_pid != os.getpid():
+                    self._session = self._new_session()
+                    self._session_pid = os.getpid()
+        return self._session
+
+    def _new_session(self) -> requests.Session:
+        config = self._strategy_config or {}
+        # POST is not idempotent - a request whose response timed out may still be converted by the
+        # server, so it is retried only when `read_retries` allows it
+        retry = Retry(total=int(config.get('retries', 3)), read=int(config.get('read_retries', 0)),
+                      backoff_factor=float(config.get('retry_backoff', 1)),
+                      status_forcelist=self.RETRY_STATUSES, allowed_methods=None, raise_on_status=False)
+        pool_size = int(config.get('pool_size', 32))  # connections kept alive - for all the tasks of the process
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        session = requests.Session()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
@@ -1,79 +1,297 @@
 from __future__ import annotations
+import json
 import os
+import time
 import yaml
 import importlib
 import pkgutil
-from typing import Type, Dict
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from hashlib import md5
+from typing import Type, Dict, Iterator, List, Optional, Set, Tuple, Union
 
 from pydantic.v1.typing import get_class
 
-from extract.extract_result import ExtractResult
+from text_extract_api.extract.extract_result import ExtractResult
+from text_extract_api.extract.extract_context import ExtractContext
 from text_extract_api.files.file_formats.file_format import FileFormat
 
 class Strategy:
     _strategies: Dict[str, Strategy] = {}
     _strategy_config: Dict[str, Dict] = {}
+    # Registry state is kept on `Strategy` itself, shared by all the subclasses
+    _config_path: str = os.getenv('OCR_CONFIG_PATH', 'config/strategies.yaml')
+    _config: Optional[Dict[str, Dict]] = None
+    _config_mtime: Optional[float] = None
+    _config_checked_at: float = 0.0
+    _configured_names: Set[str] = set()  # strategies created from the config file
+    _registry_lock = threading.RLock()
+    CONFIG_CHECK_INTERVAL = float(os.getenv('OCR_CONFIG_CHECK_INTERVAL', 1))
+    RUNTIME_CONFIG_KEYS = ('queue', 'worker', 'page_concurrency', 'warm_up', 'keep_alive', 'timeout', 'connect_timeout',
+                           'retries', 'retry_backoff', 'pool_size', 'single_pass')
 
     def __init__(self):
-        self.update_state_callback = None
+        # Instances are shared by all the tasks of a worker process - per-task state
+        # goes to the `ExtractContext` passed to `extract_text`
         self._strategy_config = None
 
     def set_strategy_config(self, config: Dict):
         self._strategy_config = config
 
-    def set_update_state_callback(self, callback):
-        self.update_state_callback = callback
+    def model(self) -> Optional[str]:
+        return (self._strategy_config or {}).get('model')
 
-    def update_state(self, state, meta):
-        if self.update_state_callback:
-            self.update_state_callback(state, meta)
+    def config_version(self) -> str:
+        """
+        Hash of the strategy config - results cached with a different config are not reused.
+        Settings which do not change the results (queue, worker, concurrency) are left out.
+        """
+        return self.config_digest(self._strategy_config)
+
+    @classmethod
+    def config_digest(cls, strategy_config: Optional[Dict]) -> str:
+        config = {key: value for key, value in (strategy_config or {}).items()
+                  if key not in cls.RUNTIME_CONFIG_KEYS}
+        config = json.dumps(config, sort_keys=True, default=str)
+        return md5(config.encode('utf-8')).hexdigest()
+
+    def warm_up(self):
+        """
+        Called once per worker process before any task runs. Strategies loading
+        heavy models may override it to preload them; the default does nothing.
+        """
+        pass
 
     @classmethod
     def name(cls) -> str:
         raise NotImplementedError("Strategy subclasses must implement name")
 
-    @classmethod
-    def extract_text(cls, file_format: Type["FileFormat"], language: str = 'en') -> ExtractResult:
+    def extract_text(self, file_format: FileFormat, language: str = 'en',
+                     context: Optional[ExtractContext] = None) -> ExtractResult:
         raise NotImplementedError("Strategy subclasses must implement extract_text method")
 
+    def extract_structured(self, file_format: FileFormat, prompt: str, output_format: Optional[Union[str, Dict]] = None,
+                           language: str = 'en', context: Optional[ExtractContext] = None) -> ExtractResult:
+        """
+        Single pass extraction - answers the prompt straight from the document (e.g. a vision
+        model filling a JSON schema), instead of OCR followed by an LLM transformation of the
+        text. `output_format` is a JSON schema (or "json") the answer must follow. Strategies
+        implementing it are marked with `single_pass: true` in the config (see `strategy_info`).
+        """
+        raise NotImplementedError(f"Strategy {self.name()} does not support single pass extraction")
+
+    def extract_page(self, image: FileFormat, language: str = 'en', page_number: int = 1,
+                     num_pages: int = 1, context: Optional[ExtractContext] = None) -> str:
+        raise NotImplementedError("Page based strategies must implement extract_page method")
+
+    def extract_page_batch(self, images: List[FileFormat], language: str = 'en', first_page_number: int = 1,
+                           num_pages: int = 1, context: Optional[ExtractContext] = None) -> List[str]:
+        """
+        OCR of several consecutive pages at once, returns the text of each page. Strategies
+        able to process more pages in one call (e.g. multi-image LLM requests) may override
+        it; by default the pages are extracted one by one with `extract_page`.
+        """
+        return [self.extract_page(image, language, first_page_number + index, num_pages, context)
+                for index, image in enumerate(images)]
+
+    def extract_pages(self, file_format: FileFormat, language: str = 'en',
+                      context: Optional[ExtractContext] = None, concurrency: int = 1,
+                      batch_size: int = 1) -> Iterator[str]:
+        """
+        Rasterizes the file lazily and yields the text of each page using `extract_page`.
+
+        Every page is looked up in the page cache by its own image hash first, so when
+        an amended document is uploaded again only the pages that changed are OCRed.
+
+        With `concurrency` above 1, up to that many pages (or batches) are OCRed at once in a
+        thread pool (for strategies waiting on a server, e.g. Ollama with `OLLAMA_NUM_PARALLEL`).
+        With `batch_size` above 1, pages missing in the cache are passed to `extract_page_batch`
+        in batches of that size. Either way the pages are yielded in page order.
+        """
+        from text_extract_api.files.file_formats.image import ImageFileFormat
+
+        context = context or ExtractContext()
+        start_time = time.time()
+        num_pages = file_format.page_count()
+        pages_from_cache = 0
+        images = file_format.convert_to_iterator(ImageFileFormat)
+        for page_number, cache_key, from_cache, page_text in self._ocr_pages(images, language, num_pages, context,
+                                                                            concurrency, batch_size):
+            if from_cache:
+                pages_from_cache += 1
+            elif context.page_cache:
+                context.page_cache.set(cache_key, page_text)
+
+            context.add_page(page_number, num_pages, page_text, from_cache)
+            context.update_state(state='PROGRESS', meta={
+                'progress': str(30 + int(20 * page_number / num_pages)),
+                'status': f'OCR Processing (page {page_number} of {num_pages}, {pages_from_cache} from cache)',
+                'pages_done': page_number,
+                'pages_total': num_pages,
+                'pages_from_cache': pages_from_cache,
+                'start_time': start_time,
+                'elapsed_time': time.time() - start_time})
+
+            yield page_text
+
+        context.flush()  # the last pages' progress may have been held back
+
+    def _ocr_pages(self, images: Iterator[FileFormat], language: str, num_pages: int, context: ExtractContext,
+                   concurrency: int, batch_size: int) -> Iterator[Tuple]:
+        """
+        Looks the pages up in the page cache and starts the OCR of the others in batches,
+        keeping up to `concurrency` batches in flight.
+
+        Yields:
+            The page number, cache key, whether the text came from the cache and the text - in page order.
+        """
+        executor = ThreadPoolExecutor(concurrency, thread_name_prefix=self.name()) if concurrency > 1 else None
+        in_flight = deque()  # (page_number, cache_key, from_cache, batch, index in the batch)
+        batch = None  # pages not sent yet
+        try:
+            for page_number, image in enumerate(images, start=1):
+                cache_key, page_text = self._cached_page(image, language, context)
+                if page_text is not None:
+                    if batch:  # batches hold consecutive pages only
+                        batch.start(self, language, num_pages, context, executor)
+                        batch = None
+                    in_flight.append((page_number, cache_key, True, _PageBatch.done([page_text]), 0))
+                else:
+                    batch = batch or _PageBatch(page_number)
+                    in_flight.append((page_number, cache_key, False, batch, len(batch.images)))
+                    batch.images.append(image)
+                    if len(batch.images) >= batch_size:
+                        batch.start(self, language, num_pages, context, executor)
+                        batch = None
+
+                while len(in_flight) >= concurrency * batch_size:
+                    yield self._finish_page(in_flight.popleft(), language, num_pages, context, executor)
+
+            while in_flight:
+                yield self._finish_page(in_flight.popleft(), language, num_pages, context, executor)
+        finally:
+            if executor:
+                executor.shutdown(wait=True, cancel_futures=True)
+
+    def _cached_page(self, image: FileFormat, language: str, context: ExtractContext) -> Tuple:
+        if not context.page_cache:
+            return None, None
+        cache_key = context.page_cache.key(image.hash, self.name(), self.model(), language, self.config_version())
+        return cache_key, context.page_cache.get(cache_key)
+
+    def _finish_page(self, page: Tuple, language: str, num_pages: int, context: ExtractContext,
+                     executor: Optional[ThreadPoolExecutor]) -> Tuple:
+        page_number, cache_key, from_cache, batch, index = page
+        if batch.future is None:  # the last, incomplete batch
+            batch.start(self, language, num_pages, context, executor)
+        return page_number, cache_key, from_cache, batch.future.result()[index]
+
     @classmethod
     def get_strategy(cls, name: str) -> Type["Strategy"]:
         """
-        Fetches and returns a registered strategy class based on the given name.
+        Fetches and returns a registered strategy based on the given name.
+
+        Strategies from the config file are created on first use - only then is their class
+        imported. Unknown names fail right away; no packages are scanned (see
+        `autodiscover_strategies` to register the strategies of other packages).
 
         Args:
             name: The name of the strategy to fetch.
 
         Returns:
-            The strategy class corresponding to the provided name.
+            The strategy corresponding to the provided name.
 
         Raises:
             ValueError: If the specified strategy name does not exist among the registered strategies.
         """
+        config = cls.strategies_config()
+        strategy = Strategy._strategies.get(name)
+        if strategy is not None:
+            return strategy
+
+        if name not in config:
+            raise ValueError(f"Unknown strategy '{name}'. Available: {', '.join(cls.strategy_names())}")
+
+        with Strategy._registry_lock:
+            if name not in Strategy._strategies:
+                strategy = cls.strategy_class(name)()
+                strategy.set_strategy_config(config[name])
+                Strategy._strategies[name] = strategy
+                Strategy._configured_names.add(name)
+                print(f"Loaded strategy from {cls.config_file_path(Strategy._config_path)} {name} "
+                      f"[{config[name]['class']}]")
+            return Strategy._strategies[name]
 
-        if name not in cls._strategies:
-            cls.load_strategies_from_config()
+    @classmethod
+    def strategy_class(cls, name: str) -> Type["Strategy"]:
+        """
+        Class of the strategy, without creating it - the module is imported on first use.
+        """
+        config = cls.strategies_config()
+        if name in Strategy._strategies:
+            return type(Strategy._strategies[name])
+        if name not in config:
+            raise ValueError(f"Unknown strategy '{name}'. Available: {', '.join(cls.strategy_names())}")
+        if 'class' not in config[name]:
+            raise ValueError(f"Missing 'class' attribute for OCR strategy: {name}")
 
-        if name not in cls._strategies:
-            cls.autodiscover_strategies()
+        module_path, class_name = config[name]['class'].rsplit('.', 1)
+        return getattr(importlib.import_module(module_path), class_name)
 
-        if name not in cls._strategies:
-            available = ', '.join(cls._strategies.keys())
-            raise ValueError(f"Unknown strategy '{name}'. Available: {available}")
+    @classmethod
+    def strategy_info(cls, name: str) -> Dict:
+        """
+        What the API needs to know about the strategy, read from its settings - the strategy
+        class is not imported, so the API process does not load the OCR libraries.
+        """
+        config = cls.strategies_config()
+        if name in Strategy._strategies and name not in Strategy._configured_names:  # registered in code
+            strategy_config = Strategy._strategies[name]._strategy_config or {}
+        elif name in config:
+            strategy_config = config[name]
+        else:
+            raise ValueError(f"Unknown strategy '{name}'. Available: {', '.join(cls.strategy_names())}")
+
+        return {
+            'name': name,
+            'class': strategy_config.get('class'),
+            'model': strategy_config.get('model'),
+            'config_version': cls.config_digest(strategy_config),
+            'queue': strategy_config.get('queue'),
+            'single_pass': bool(strategy_config.get('single_pass')),
+        }
 
-        return cls._strategies[name]
+    @classmethod
+    def exists(cls, name: str) -> bool:
+        """
+        Whether the strategy is registered or configured - a dictionary lookup, nothing is imported.
+        """
+        return name in Strategy._strategies or name in cls.strategies_config()
+
+    @classmethod
+    def strategy_names(cls) -> List[str]:
+        return list(dict.fromkeys([*cls.strategies_config(), *Strategy._strategies]))
 
     @classmethod
     def register_strategy(cls, strategy: Type["Strategy"], name: str = None, override: bool = False):
         name = name or strategy.name()
-        if override or name not in cls._strategies:
-            cls._strategies[name] = strategy
+        with Strategy._registry_lock:
+            if override or name not in Strategy._strategies:
+                Strategy._strategies[name] = strategy
+                Strategy._configured_names.discard(name)
 
     @classmethod
-    def load_strategies_from_config(cls, path: str = os.getenv('OCR_CONFIG_PATH', 'config/strategies.yaml')):
-        strategies = cls._strategies
+    def config_file_path(cls, path: str = os.getenv('OCR_CONFIG_PATH', 'config/strategies.yaml')) -> str:
         project_root = os.path.dirname(os.path.dirname(os.path.abspath(path)))
-        config_file_path = os.path.join(project_root, path)
+        return os.path.join(project_root, path)
+
+    @classmethod
+    def load_config(cls, path: str = os.getenv('OCR_CONFIG_PATH', 'config/strategies.yaml')) -> Dict[str, Dict]:
+        """
+        Reads the `strategies` section of the config file - strategy name to its settings.
+        """
+        config_file_path = cls.config_file_path(path)
 
         if not os.path.isfile(config_file_path):
             raise FileNotFoundError(f"Config file not found at path: {config_file_path}")
@@ -84,22 +302,55 @@ class Strategy:
         if 'strategies' not in config or not isinstance(config['strategies'], dict):
             raise ValueError(f"Missing or invalid 'strategies' section in the {config_file_path} file")
 
-        for strategy_name, strategy_config in config['strategies'].items():
-            if 'class' not in strategy_config:
-                raise ValueError(f"Missing 'class' attribute for OCR strategy: {strategy_name}")
+        return config['strategies']
 
-            strategy_class_path = strategy_config['class']
-            module_path, class_name = strategy_class_path.rsplit('.', 1)
-            module = importlib.import_module(module_path)
+    @classmethod
+    def strategies_config(cls) -> Dict[str, Dict]:
+        """
+        The config file settings (see `load_config`), cached. The file is read again when its
+        modification time changes - checked at most every `CONFIG_CHECK_INTERVAL` seconds.
+        Strategies created from settings which changed are dropped, and created again with the
+        new settings on next use.
+        """
+        now = time.monotonic()
+        if Strategy._config is not None and now - Strategy._config_checked_at < Strategy.CONFIG_CHECK_INTERVAL:
+            return Strategy._config
+
+        with Strategy._registry_lock:
+            config_file_path = cls.config_file_path(Strategy._config_path)
+            mtime = os.path.getmtime(config_file_path) if os.path.isfile(config_file_path) else None
+            if Strategy._config is None or mtime != Strategy._config_mtime:
+                config = cls.load_config(Strategy._config_path)
+                for name in list(Strategy._configured_names):
+                    if config.get(name) != Strategy._config.get(name):
+                        print(f"Strategy {name} changed in {config_file_path} - reloading")
+                        Strategy._strategies.pop(name, None)
+                        Strategy._configured_names.discard(name)
+                Strategy._config = config
+                Strategy._config_mtime = mtime
+            Strategy._config_checked_at = now
+            return Strategy._config
 
-            strategy = getattr(module, class_name)
-            strategy_instance = strategy()
-            strategy_instance.set_strategy_config(strategy_config)
-            
-            cls.register_strategy(strategy_instance, strategy_name)
-            print(f"Loaded strategy from {config_file_path} {strategy_name} [{strategy_class_path}]")
+    @classmethod
+    def load_strategies_from_config(cls):
+        """
+        Creates all the strategies from the config file at once.
+        """
+        for strategy_name in cls.strategies_config():
+            cls.get_strategy(strategy_name)
 
-        return strategies
+        return Strategy._strategies
+
+    @classmethod
+    def warm_up_strategies(cls, names: Optional[List[str]] = None):
+        """
+        Warms up the given strategies, all of them by default.
+        """
+        for name in names or cls.strategy_names():
+            try:
+                cls.get_strategy(name).warm_up()
+            except Exception as e:
+                print(f"Failed to warm up strategy {name}: {e}")
 
     @classmethod
     def autodiscover_strategies(cls) -> Dict[str, Type]:
@@ -139,4 +390,33 @@ class Strategy:
         cls._strategies = strategies
 
 
+class _PageBatch:
+    """
+    Consecutive pages OCRed in one `extract_page_batch` call, starting at `first_page_number`.
+    """
+
+    def __init__(self, first_page_number: int):
+        self.first_page_number = first_page_number
+        self.images = []
+        self.future = None
 
+    @classmethod
+    def done(cls, pages_text: List[str]) -> "_PageBatch":
+        batch = cls(0)
+        batch.future = Future()
+        batch.future.set_result(pages_text)
+        return batch
+
+    def start(self, strategy: Strategy, language: str, num_pages: int, context: ExtractContext,
+              executor: Optional[ThreadPoolExecutor]):
+        if len(self.images) == 1:
+            call = (lambda: [strategy.extract_page(self.images[0], language, self.first_page_number, num_pages,
+                                                   context)])
+        else:
+            call = (lambda: strategy.extract_page_batch(self.images, language, self.first_page_number, num_pages,
+                                                        context))
+        if executor:
+            self.future = executor.submit(call)
+        else:
+            self.future = Future()
+            self.future.set_result(call())
@@ -1,96 +1,384 @@
+import json
 import os
 import time
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
+from typing import Dict, List, Optional, Tuple, Union
 
-import ollama
 import redis
+from celery import Signature, Task, chord
+from celery.signals import task_postrun
 
 from text_extract_api.celery_app import app as celery_app
+from text_extract_api.extract.cache import llm_result_cache, ocr_page_cache, ocr_result_cache
+from text_extract_api.extract.events import TaskEvents
+from text_extract_api.extract.extract_context import ExtractContext
+from text_extract_api.extract.extract_result import ExtractResult
+from text_extract_api.extract.llm_chunks import LLM_MERGE_PROMPT, estimate_tokens, group_chunks, split_text
+from text_extract_api.extract.ollama_pool import ollama_pool
+from text_extract_api.extract.progress import ProgressReporter
+from text_extract_api.extract.single_flight import SingleFlight
 from text_extract_api.extract.strategies.strategy import Strategy
+from text_extract_api.files.blob_store import BlobStore
 from text_extract_api.files.file_formats.file_format import FileFormat
+from text_extract_api.files.file_formats.pdf import PdfFileFormat
 from text_extract_api.files.storage_manager import StorageManager
 
 # Connect to Redis
 redis_url = os.getenv('REDIS_CACHE_URL', 'redis://redis:6379/1')
 redis_client = redis.StrictRedis.from_url(redis_url)
+ocr_cache_tier = ocr_result_cache(redis_client)
+ocr_page_cache_tier = ocr_page_cache(redis_client)
+llm_cache_tier = llm_result_cache(redis_client)
+single_flight = SingleFlight(redis_client)
+blob_store = BlobStore()
+
+LLM_REDUCE_MODES = ('concat', 'merge')
+LLM_CHUNK_CONCURRENCY = int(os.getenv('LLM_CHUNK_CONCURRENCY', 4))
 
 
 @celery_app.task(bind=True)
-def ocr_task(
+def extract_task(
         self,
-        binary_content: bytes,
+        blob_ref: str,
         strategy_name: str,
-        filename: str,
         file_hash: str,
         ocr_cache: bool,
-        prompt: Optional[str] = None,
-        model: Optional[str] = None,
         language: Optional[str] = None,
-        storage_profile: Optional[str] = None,
-        storage_filename: Optional[str] = None,
+        pages_per_task: int = 0,
+        prompt: Optional[str] = None,
+        output_format: Optional[Union[str, Dict]] = None,
+        llm_cache: bool = True,
+        job: Optional[Dict] = None,
 ):
     """
-    Celery task to perform OCR processing on a PDF/Office/image file.
+    Extract stage - OCR of the PDF/Office/image file, returns the extracted text.
+
+    The file itself is not part of the task message - `blob_ref` points to the upload
+    staged in the `BlobStore` by the API, removed once this stage is done.
+
+    With `pages_per_task`, PDFs with more pages are split into page ranges OCRed by
+    `extract_pages_task` on any free worker - this task is replaced by their chord.
+
+    With a `prompt`, the strategy answers it straight from the document in a single pass
+    (see `Strategy.extract_structured`) and the answer, following the `output_format`
+    JSON schema if given, is returned instead of the text. It is cached with the LLM results.
     """
     start_time = time.time()
+    progress = job_progress(self, job)
 
     strategy = Strategy.get_strategy(strategy_name)
-    strategy.set_update_state_callback(self.update_state)
+    context = ExtractContext(progress.update, ocr_page_cache_tier if ocr_cache else None, progress)
+
+    progress.update(state='PROGRESS', meta={'progress': 10, 'status': "File uploaded successfully"})
 
-    self.update_state(state='PROGRESS', status="File uploaded successfully",
-                      meta={'progress': 10})  # Example progress update
+    cache_key = ocr_cache_tier.key(file_hash, strategy_name, strategy.model(), language, strategy.config_version())
+    cache_tier, use_cache = ocr_cache_tier, ocr_cache
+    if prompt:
+        cache_key = llm_cache_tier.key(cache_key, llm_cache_tier.digest(prompt),
+                                       llm_cache_tier.digest(json.dumps(output_format, sort_keys=True)))
+        cache_tier, use_cache = llm_cache_tier, llm_cache
 
     extracted_text = None
-    if ocr_cache:
-        cached_result = redis_client.get(file_hash)
-        if cached_result:
-            # Return cached result if available
-            extracted_text = cached_result.decode('utf-8')
+    if use_cache:
+        # Return cached result if available
+        extracted_text = cache_tier.get(cache_key)
 
     if extracted_text is None:
         print(f"Extracting text from file using strategy: {strategy.name()}")
-        self.update_state(state='PROGRESS',
-                          meta={'progress': 30, 'status': 'Extracting text from file', 'start_time': start_time,
-                                'elapsed_time': time.time() - start_time})  # Example progress update
-        extract_result = strategy.extract_text(FileFormat.from_binary(binary_content), language)
+        progress.update(state='PROGRESS',
+                        meta={'progress': 30, 'status': 'Extracting text from file', 'start_time': start_time,
+                              'elapsed_time': time.time() - start_time})
+        file_format = FileFormat.from_binary(blob_store.get(blob_ref))
+        if prompt:
+            extract_result = strategy.extract_structured(file_format, prompt, output_format, language, context)
+        elif pages_per_task and isinstance(file_format, PdfFileFormat) and file_format.page_count() > pages_per_task:
+            return self.replace(fan_out_pages(blob_ref, strategy_name, ocr_cache, language, file_format.page_count(),
+                                              pages_per_task, cache_key if ocr_cache else None, job))
+        else:
+            extract_result = strategy.extract_text(file_format, language, context)
         extracted_text = extract_result.text
 
+        if use_cache:
+            cache_tier.set(cache_key, extracted_text)
+
     else:
         print("Using cached result...")
 
     print("After extracted text")
-    self.update_state(state='PROGRESS',
-                      meta={'progress': 50, 'status': 'Text extracted', 'extracted_text': extracted_text,
-                            'start_time': start_time,
-                            'elapsed_time': time.time() - start_time})  # Example progress update
+    # The text itself is not part of the state - extracted pages are read from the page records
+    progress.update(state='PROGRESS', meta={'progress': 50, 'status': 'Text extracted', 'start_time': start_time,
+                                            'elapsed_time': time.time() - start_time}, force=True)
+    job_done(self, job, progress, start_time)
+
+    return extracted_text
 
-    # @todo Universal Text Object - is cache available
-    if ocr_cache:
-        redis_client.set(file_hash, extracted_text)
 
-    if prompt:
-        print(f"Transforming text using LLM (prompt={prompt}, model={model}) ...")
-        self.update_state(state='PROGRESS', meta={'progress': 75, 'status': 'Processing LLM', 'start_time': start_time,
-                                                  'elapsed_time': time.time() - start_time})  # Example progress update
-        llm_resp = ollama.generate(model, prompt + extracted_text, stream=True)
-        num_chunk = 1
-        extracted_text = ''  # will be filled with chunks from llm
-        for chunk in llm_resp:
-            self.update_state(state='PROGRESS',
-                              meta={'progress': num_chunk, 'status': 'LLM Processing chunk no: ' + str(num_chunk),
-                                    'start_time': start_time,
-                                    'elapsed_time': time.time() - start_time})  # Example progress update
-            num_chunk += 1
-            extracted_text += chunk['response']
-
-    if storage_profile:
-        if not storage_filename:
-            storage_filename = filename.replace('.', '_') + '.pdf'
-
-        storage_manager = StorageManager(storage_profile)
-        storage_manager.save(filename, storage_filename, extracted_text)
-
-    self.update_state(state='DONE', meta={'progress': 100, 'status': 'Processing done!', 'start_time': start_time,
+@celery_app.task(bind=True, autoretry_for=(Exception,), dont_autoretry_for=(FileNotFoundError,),
+                 max_retries=int(os.getenv('OCR_PAGE_RETRIES', 2)), retry_backoff=True)
+def extract_pages_task(
+        self,
+        blob_ref: str,
+        strategy_name: str,
+        ocr_cache: bool,
+        language: Optional[str],
+        first_page: int,
+        last_page: int,
+        pages_total: int,
+        job: Optional[Dict] = None,
+):
+    """
+    Fan-out part of the extract stage - OCR of the pages from `first_page` to `last_page` of
+    the staged PDF. Failed ranges are retried on their own (`OCR_PAGE_RETRIES` times).
+    """
+    start_time = time.time()
+    progress = job_progress(self, job, page_offset=first_page - 1, pages_total=pages_total)
+
+    strategy = Strategy.get_strategy(strategy_name)
+    # No update_state - the progress of the whole document is reported below
+    context = ExtractContext(page_cache=ocr_page_cache_tier if ocr_cache else None, progress=progress)
+
+    pages = FileFormat.from_binary(blob_store.get(blob_ref)).split(first_page, last_page)
+    extracted_text = strategy.extract_text(pages, language, context).text
+
+    pages_done = progress.count_pages_done(last_page - first_page + 1)
+    progress.update(state='PROGRESS', meta={
+        'progress': 30 + int(20 * pages_done / pages_total),
+        'status': f'OCR Processing ({pages_done} of {pages_total} pages)',
+        'pages_done': pages_done,
+        'pages_total': pages_total,
+        'start_time': start_time,
+        'elapsed_time': time.time() - start_time}, force=True)
+
+    return extracted_text
+
+
+@celery_app.task(bind=True)
+def merge_pages_task(
+        self,
+        pages_text: List[str],
+        cache_key: Optional[str] = None,
+        blob_ref: Optional[str] = None,
+        job: Optional[Dict] = None,
+):
+    """
+    Chord callback of the fan-out - merges the page ranges (in page order) into the extract stage result.
+    """
+    start_time = time.time()
+    progress = job_progress(self, job)
+
+    extract_result = ExtractResult.from_text("\n\n".join(pages_text))
+    extracted_text = extract_result.text
+    if cache_key:
+        ocr_cache_tier.set(cache_key, extracted_text)
+
+    progress.update(state='PROGRESS', meta={'progress': 50, 'status': 'Text extracted', 'start_time': start_time,
+                                            'elapsed_time': time.time() - start_time}, force=True)
+    job_done(self, job, progress, start_time)
+
+    return extracted_text
+
+
+@celery_app.task(bind=True)
+def llm_task(
+        self,
+        extracted_text: str,
+        prompt: str,
+        model: Optional[str] = None,
+        llm_cache: bool = True,
+        llm_chunk_tokens: int = 0,
+        llm_reduce: str = 'concat',
+        job: Optional[Dict] = None,
+):
+    """
+    LLM stage - transforms the extracted text with the prompt, returns the LLM output.
+
+    With `llm_chunk_tokens`, texts longer than that are transformed chunk by chunk and the
+    outputs combined with `llm_reduce` (see `llm_map_reduce`).
+    """
+    start_time = time.time()
+    progress = job_progress(self, job)
+
+    print(f"Transforming text using LLM (prompt={prompt}, model={model}) ...")
+    progress.update(state='PROGRESS', meta={'progress': 75, 'status': 'Processing LLM', 'start_time': start_time,
+                                            'elapsed_time': time.time() - start_time})
+    chunked = bool(llm_chunk_tokens) and estimate_tokens(extracted_text) > llm_chunk_tokens
+    llm_cache_parts = [llm_cache_tier.digest(model), llm_cache_tier.digest(prompt), llm_cache_tier.digest(extracted_text)]
+    if chunked:
+        llm_cache_parts.append(llm_cache_tier.digest(
+            f"{llm_chunk_tokens}:{llm_reduce}:{LLM_MERGE_PROMPT if llm_reduce == 'merge' else ''}"))
+    llm_cache_key = llm_cache_tier.key(*llm_cache_parts)
+    llm_text = llm_cache_tier.get(llm_cache_key) if llm_cache else None
+
+    if llm_text is None:
+        if chunked:
+            llm_text = llm_map_reduce(model, prompt, extracted_text, llm_chunk_tokens, llm_reduce, progress,
+                                      start_time)
+        else:
+            llm_text = ''  # will be filled with chunks from llm
+            with ollama_pool().client(model) as client:
+                llm_resp = client.generate(model, prompt + extracted_text, stream=True)
+                num_chunk = 1
+                for chunk in llm_resp:
+                    progress.update(state='PROGRESS',
+                                    meta={'progress': 75, 'status': 'LLM Processing chunk no: ' + str(num_chunk),
+                                          'start_time': start_time,
                                           'elapsed_time': time.time() - start_time})
+                    num_chunk += 1
+                    llm_text += chunk['response']
+                    progress.events.publish('llm_chunk', {'text': chunk['response']})
+
+        if llm_cache:
+            llm_cache_tier.set(llm_cache_key, llm_text)
+    else:
+        print("Using cached LLM result...")
+
+    job_done(self, job, progress, start_time)
+
+    return llm_text
+
+
+@celery_app.task(bind=True)
+def store_task(
+        self,
+        extracted_text: str,
+        filename: str,
+        storage_profile: str,
+        storage_filename: Optional[str] = None,
+        job: Optional[Dict] = None,
+):
+    """
+    Storage stage - saves the text using the storage profile, returns it unchanged.
+    """
+    start_time = time.time()
+    progress = job_progress(self, job)
+    progress.update(state='PROGRESS', meta={'progress': 90, 'status': 'Saving the result', 'start_time': start_time,
+                                            'elapsed_time': time.time() - start_time})
+
+    if not storage_filename:
+        storage_filename = filename.replace('.', '_') + '.pdf'
+
+    storage_manager = StorageManager(storage_profile)
+    storage_manager.save(filename, storage_filename, extracted_text)
+
+    job_done(self, job, progress, start_time)
 
     return extracted_text
+
+
+def llm_map_reduce(model: str, prompt: str, text: str, chunk_tokens: int, reduce: str,
+                   progress: ProgressReporter, start_time: float) -> str:
+    """
+    Runs the prompt over chunks of the text of at most `chunk_tokens` tokens each (split on page
+    and paragraph boundaries), `LLM_CHUNK_CONCURRENCY` requests at once, balanced over the Ollama
+    hosts. The outputs are then combined in the text order: `concat` joins them, `merge` asks the
+    model to merge them with `LLM_MERGE_PROMPT` (e.g. for JSON outputs) - in several rounds when
+    they do not fit in `chunk_tokens` at once.
+    """
+    if reduce not in LLM_REDUCE_MODES:
+        raise ValueError(f"Unknown LLM reduce mode '{reduce}'. Available: {', '.join(LLM_REDUCE_MODES)}")
+
+    chunks = split_text(text, chunk_tokens)
+    print(f"Transforming {len(chunks)} chunks of up to {chunk_tokens} tokens with LLM (model={model}) ...")
+    outputs = llm_generate_all(model, [prompt + chunk for chunk in chunks], 'chunk', progress, start_time)
+    if reduce == 'concat':
+        return "\n\n".join(outputs)
+
+    while len(outputs) > 1:
+        groups = group_chunks(outputs, chunk_tokens)
+        merged = llm_generate_all(model, [LLM_MERGE_PROMPT + "\n\n".join(group) for group in groups if len(group) > 1],
+                                  'merge', progress, start_time)
+        outputs = [merged.pop(0) if len(group) > 1 else group[0] for group in groups]
+    return outputs[0]
+
+
+def llm_generate_all(model: str, prompts: List[str], label: str, progress: ProgressReporter,
+                     start_time: float) -> List[str]:
+    """
+    LLM outputs for the prompts, in the prompts order; the progress is reported as they complete.
+    """
+
+    def generate(prompt: str) -> str:
+        with ollama_pool().client(model) as client:
+            return client.generate(model, prompt)['response']
+
+    outputs = [None] * len(prompts)
+    with ThreadPoolExecutor(max_workers=max(1, min(LLM_CHUNK_CONCURRENCY, len(prompts)))) as executor:
+        futures = {executor.submit(generate, prompt): index for index, prompt in enumerate(prompts)}
+        for done, future in enumerate(as_completed(futures), start=1):
+            outputs[futures[future]] = future.result()
+            progress.update(state='PROGRESS',
+                            meta={'progress': 75, 'status': f'LLM Processing {label} {done} of {len(prompts)}',
+                                  'start_time': start_time, 'elapsed_time': time.time() - start_time}, force=True)
+            progress.events.publish('llm_part', {'stage': label, 'done': done, 'total': len(prompts)})
+    return outputs
+
+
+def page_ranges(pages_total: int, pages_per_task: int) -> List[Tuple[int, int]]:
+    """
+    Splits the pages into consecutive (first_page, last_page) ranges of `pages_per_task` pages.
+    """
+    return [(first_page, min(first_page + pages_per_task - 1, pages_total))
+            for first_page in range(1, pages_total + 1, pages_per_task)]
+
+
+def fan_out_pages(blob_ref: str, strategy_name: str, ocr_cache: bool, language: Optional[str], pages_total: int,
+                  pages_per_task: int, cache_key: Optional[str], job: Optional[Dict]) -> Signature:
+    """
+    Chord OCRing the page ranges in parallel and merging them in page order.
+    """
+    return chord(
+        [extract_pages_task.si(blob_ref, strategy_name, ocr_cache, language, first_page, last_page, pages_total,
+                               job=job)
+         for first_page, last_page in page_ranges(pages_total, pages_per_task)],
+        merge_pages_task.s(cache_key, blob_ref=blob_ref, job=job)
+    )
+
+
+def job_progress(task: Task, job: Optional[Dict], **kwargs) -> ProgressReporter:
+    """
+    Progress reporter writing the state of the whole job - under the job id, not the stage task id.
+    """
+    job_id = (job or {}).get('id') or task.request.id
+    return ProgressReporter(partial(task.update_state, job_id), redis_client, job_id, **kwargs)
+
+
+def job_done(task: Task, job: Optional[Dict], progress: ProgressReporter, start_time: float):
+    if not job or job.get('id') in (None, task.request.id):  # the last stage
+        progress.update(state='DONE', meta={'progress': 100, 'status': 'Processing done!', 'start_time': start_time,
+                                            'elapsed_time': time.time() - start_time})
+    else:
+        progress.flush()  # the next stage reports its own progress from now on
+
+
+@task_postrun.connect
+def cleanup_ocr_job(sender=None, task_id=None, args=None, kwargs=None, retval=None, state=None, **extra):
+    """
+    Removes the staged upload once the extract stage is done. When the job has finished - its
+    last stage succeeded or any stage failed - notifies the stream subscribers and lets the next
+    identical request start a new job.
+    """
+    stage = getattr(sender, 'name', None)
+    stages = (extract_task.name, extract_pages_task.name, merge_pages_task.name, llm_task.name, store_task.name)
+    if stage not in stages or state not in ('SUCCESS', 'FAILURE'):
+        return  # e.g. retried, or replaced by the page fan-out
+
+    if stage == extract_task.name or (stage == extract_pages_task.name and state == 'FAILURE'):
+        blob_store.delete(args[0])
+    elif stage == merge_pages_task.name and kwargs.get('blob_ref'):
+        blob_store.delete(kwargs['blob_ref'])
+
+    job = (kwargs or {}).get('job') or {}
+    job_id = job.get('id') or task_id
+    if state == 'SUCCESS':
+        if job_id != task_id:
+            return  # the next stage is on its way
+        TaskEvents(redis_client, job_id).publish('done', {'state': state, 'result': retval})
+    else:
+        if job_id != task_id:
+            # The chain stops here - the job (last stage) would stay in progress forever
+            celery_app.backend.mark_as_failure(job_id, retval)
+        TaskEvents(redis_client, job_id).publish('done', {'state': state, 'error': str(retval)})
+
+    if job.get('single_flight_key'):
+        single_flight.release(job['single_flight_key'], job_id)
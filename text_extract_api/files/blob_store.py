@@ -0,0 +1,90 @@
+import os
+import re
+import uuid
+from hashlib import md5
+from typing import Optional
+
+from text_extract_api.files.storage_strategies.local_filesystem import resolve_path
+
+
+class BlobStore:
+    """
+    Claim-check staging area for uploaded documents.
+
+    The API stores the uploaded bytes here and sends only the returned reference through
+    the Celery broker; the worker loads the bytes by reference and deletes them once the
+    task is done. The folder (env `UPLOAD_STAGING_PATH`) must be shared by the API and
+    the workers - e.g. the same docker volume.
+    """
+    _REF_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+    def __init__(self, root_path: Optional[str] = None):
+        self.root_path = resolve_path(root_path or os.getenv('UPLOAD_STAGING_PATH', './uploads'))
+        os.makedirs(self.root_path, exist_ok=True)
+
+    def put(self, binary: bytes) -> str:
+        blob_ref = uuid.uuid4().hex
+        temp_path = self.path(blob_ref) + '.part'
+        with open(temp_path, 'wb') as blob_file:
+            blob_file.write(binary)
+        os.replace(temp_path, self.path(blob_ref))
+        return blob_ref
+
+    def writer(self, head_size: int = 2048) -> "BlobWriter":
+        """
+        Incremental writer for streamed uploads - see `BlobWriter`.
+        """
+        return BlobWriter(self, uuid.uuid4().hex, head_size)
+
+    def get(self, blob_ref: str) -> bytes:
+        with open(self.path(blob_ref), 'rb') as blob_file:
+            return blob_file.read()
+
+    def delete(self, blob_ref: str):
+        try:
+            os.remove(self.path(blob_ref))
+        except FileNotFoundError:
+            pass
+
+    def path(self, blob_ref: str) -> str:
+        if not self._REF_PATTERN.match(blob_ref):
+            raise ValueError(f"Invalid blob reference: {blob_ref}")
+        return os.path.join(self.root_path, blob_ref)
+
+
+class BlobWriter:
+    """
+    Writes a blob chunk by chunk, computing its MD5 hash on the fly and keeping only the
+    first `head_size` bytes in memory (enough to sniff the MIME type). The blob becomes
+    visible under `ref` once the `with` block exits cleanly; on error it is discarded.
+    """
+
+    def __init__(self, blob_store: BlobStore, ref: str, head_size: int):
+        self.ref = ref
+        self.size = 0
+        self.head = b''
+        self._head_size = head_size
+        self._md5 = md5()
+        self._path = blob_store.path(ref)
+        self._file = open(self._path + '.part', 'wb')
+
+    def __enter__(self) -> "BlobWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._file.close()
+        if exc_type is None:
+            os.replace(self._path + '.part', self._path)
+        else:
+            os.remove(self._path + '.part')
+
+    def write(self, chunk: bytes):
+        if len(self.head) < self._head_size:
+            self.head += chunk[:self._head_size - len(self.head)]
+        self._md5.update(chunk)
+        self._file.write(chunk)
+        self.size += len(chunk)
+
+    @property
+    def hash(self) -> str:
+        return self._md5.hexdigest()
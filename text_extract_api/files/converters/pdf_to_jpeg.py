@@ -1,29 +1,68 @@
 from __future__ import annotations
-from typing import Iterator, Type
-from pdf2image import convert_from_bytes
+import os
+import tempfile
+from typing import Iterator, Optional, Type
+from pdf2image import convert_from_path, pdfinfo_from_path
 
 from text_extract_api.files.converters.converter import Converter
 from text_extract_api.files.file_formats.image import ImageFileFormat
 from text_extract_api.files.file_formats.pdf import PdfFileFormat
 
 class PdfToJpegConverter(Converter):
+    DEFAULT_WINDOW_SIZE: int = 4
 
     @staticmethod
     def convert(file_format: PdfFileFormat) -> Iterator[Type["ImageFileFormat"]]:
-        pages = convert_from_bytes(file_format.binary)
-        if not pages:
-            raise ValueError("No pages found in the PDF.")
-        for i, page in enumerate(pages, start=1):
-            yield ImageFileFormat.from_binary(
-                binary=PdfToJpegConverter._image_to_bytes(page),
-                filename=f"{file_format.filename}_page_{i}.jpg",
-                mime_type="image/jpeg"
-            )
+        return PdfToJpegConverter.convert_pages(file_format)
 
     @staticmethod
-    def _image_to_bytes(image) -> bytes:
-        from io import BytesIO
+    def convert_pages(
+            file_format: PdfFileFormat,
+            first_page: Optional[int] = None,
+            last_page: Optional[int] = None,
+            window_size: Optional[int] = None
+    ) -> Iterator[Type["ImageFileFormat"]]:
+        """
+        Rasterizes the PDF `window_size` pages at a time (env `PDF_TO_JPEG_WINDOW_SIZE`).
 
-        buffer = BytesIO()
-        image.save(buffer, format="JPEG")
-        return buffer.getvalue()
+        Pages are rendered by poppler straight to JPEG files in a temporary folder and
+        yielded one by one, so peak memory is bounded by the window, not the document.
+        Page numbers are 1-based and `last_page` is inclusive.
+        """
+        window_size = window_size or int(os.getenv('PDF_TO_JPEG_WINDOW_SIZE', PdfToJpegConverter.DEFAULT_WINDOW_SIZE))
+        if window_size < 1:
+            raise ValueError("PDF rasterization window size must be at least 1.")
+
+        with tempfile.TemporaryDirectory() as output_folder:
+            pdf_path = os.path.join(output_folder, "document.pdf")
+            with open(pdf_path, "wb") as pdf_file:
+                pdf_file.write(file_format.binary)
+
+            num_pages = pdfinfo_from_path(pdf_path).get("Pages", 0)
+            if not num_pages:
+                raise ValueError("No pages found in the PDF.")
+
+            first_page = max(first_page or 1, 1)
+            last_page = min(last_page or num_pages, num_pages)
+
+            for window_start in range(first_page, last_page + 1, window_size):
+                window_end = min(window_start + window_size - 1, last_page)
+                page_paths = convert_from_path(
+                    pdf_path,
+                    first_page=window_start,
+                    last_page=window_end,
+                    output_folder=output_folder,
+                    fmt="jpeg",
+                    paths_only=True
+                )
+
+                for page_number, page_path in zip(range(window_start, window_end + 1), page_paths):
+                    with open(page_path, "rb") as page_file:
+                        page_binary = page_file.read()
+                    os.remove(page_path)
+
+                    yield ImageFileFormat.from_binary(
+                        binary=page_binary,
+                        filename=f"{file_format.filename}_page_{page_number}.jpg",
+                        mime_type="image/jpeg"
+                    )
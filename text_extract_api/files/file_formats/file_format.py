@@ -4,6 +4,8 @@ from typing import Type, Iterator, Optional, Dict, Callable, List, TypedDict
 
 import magic
 
+MIME_SNIFF_SIZE = 2048
+
 
 class FileFormatDict(TypedDict):
     filename: str
@@ -157,14 +159,36 @@ class FileFormat:
         return any(target_format is key for key in convertible_keys)
 
     def convert_to(self, target_format: Type["FileFormat"]) -> List["FileFormat"]:
+        """
+        Warning - this materializes every page in memory, prefer `convert_to_iterator`.
+        """
+        return list(self.convert_to_iterator(target_format))
+
+    def convert_to_iterator(self, target_format: Type["FileFormat"]) -> Iterator["FileFormat"]:
+        """
+        Lazily converts the file - pages are produced one at a time as the consumer
+        asks for them, so only the current page has to be kept in memory.
+
+        Raises:
+            ValueError: Immediately, if the conversion is not supported.
+        """
         if isinstance(self, target_format):
-            return [self]
+            return iter([self])
 
         converters = self.convertible_to()
         if target_format not in converters:
             raise ValueError(f"Cannot convert to {target_format}. Conversion not supported.")
 
-        return list(converters[target_format](self))
+        return iter(converters[target_format](self))
+
+    def page_count(self) -> int:
+        """
+        Number of pages the file will be split into by `convert_to_iterator`,
+        without converting it. Non pageable formats are always a single page.
+        """
+        if not self.is_pageable():
+            return 1
+        raise NotImplementedError("Pageable formats must implement page_count.")
 
     @staticmethod
     def convertible_to() -> Dict[Type["FileFormat"], Callable[[Type["FileFormat"]], Iterator[Type["Converter"]]]]:
@@ -205,19 +229,37 @@ class FileFormat:
     def _guess_mime_type(binary_data: Optional[bytes] = None, filename: Optional[str] = None) -> str:
         mime = magic.Magic(mime=True)
         if binary_data:
-            return mime.from_buffer(binary_data)
+            # The file signature is at the beginning - no need to pass the whole file to libmagic
+            return mime.from_buffer(binary_data[:MIME_SNIFF_SIZE])
         if filename:
             return mime.from_file(filename)
         raise ValueError("Either binary_data or filename must be provided to guess the MIME type.")
 
 
 class FileField:
+    """
+    Base64 encoded file field - decoded exactly once, when the request is validated.
+    """
+
     def __init__(self, value: str):
-        self._file_format = FileFormat.from_base64(value)
+        self.binary = base64.b64decode(value)
+        if not self.binary:
+            raise ValueError("File field is empty - corrupted base64 data.")
         self.value = value
 
     def __str__(self) -> str:
         return self.value
 
-    def __get_pydantic_core_schema__(self, handler) -> str:
-        return handler.generate_schema(str)
+    def to_file_format(self, filename: Optional[str] = None) -> "FileFormat":
+        instance = FileFormat.from_binary(self.binary, filename=filename)
+        instance._base64_cache = self.value
+        return instance
+
+    @classmethod
+    def __get_pydantic_core_schema__(cls, source, handler):
+        from pydantic_core import core_schema
+        return core_schema.no_info_after_validator_function(
+            cls,
+            core_schema.str_schema(),
+            serialization=core_schema.plain_serializer_function_ser_schema(str)
+        )
@@ -1,10 +1,12 @@
-from typing import Type, Callable, Dict, Iterator
+import io
+from typing import Type, Callable, Dict, Iterator, Optional
 
 from text_extract_api.files.file_formats.file_format import FileFormat
 
 
 class PdfFileFormat(FileFormat):
     DEFAULT_FILENAME: str = "image.pdf"
+    _page_count: Optional[int] = None
 
     @staticmethod
     def accepted_mime_types() -> list[str]:
@@ -14,6 +16,38 @@ class PdfFileFormat(FileFormat):
     def is_pageable() -> bool:
         return True
 
+    def page_count(self) -> int:
+        """
+        Reads the page count in-process with pypdfium2 - nothing is rasterized.
+        """
+        if self._page_count is None:
+            import pypdfium2
+
+            document = pypdfium2.PdfDocument(self.binary)
+            try:
+                self._page_count = len(document)
+            finally:
+                document.close()
+        return self._page_count
+
+    def split(self, first_page: int, last_page: int) -> "PdfFileFormat":
+        """
+        New PDF with the pages from `first_page` to `last_page` (1-based, inclusive) only.
+        """
+        import pypdfium2
+
+        document = pypdfium2.PdfDocument(self.binary)
+        part = pypdfium2.PdfDocument.new()
+        try:
+            part.import_pages(document, list(range(first_page - 1, last_page)))
+            output = io.BytesIO()
+            part.save(output)
+        finally:
+            part.close()
+            document.close()
+
+        return PdfFileFormat(output.getvalue(), filename=self.filename, mime_type=self.mime_type)
+
     @classmethod
     def default_iterator_file_format(cls) -> Type[FileFormat]:
         from text_extract_api.files.file_formats.image import ImageFileFormat
@@ -3,11 +3,6 @@ from enum import Enum
 
 import yaml
 
-from text_extract_api.files.storage_strategies.aws_s3 import AWSS3StorageStrategy
-from text_extract_api.files.storage_strategies.google_drive import GoogleDriveStorageStrategy
-from text_extract_api.files.storage_strategies.local_filesystem import LocalFilesystemStorageStrategy
-from text_extract_api.files.storage_strategies.storage_strategy import StorageStrategy
-
 
 class StorageStrategy(Enum):
     LOCAL_FILESYSTEM = "local_filesystem"
@@ -21,12 +16,16 @@ class StorageManager:
         with open(profile_path, 'r') as file:
             self.profile = yaml.safe_load(file)
 
+        # Storage clients are imported only when a profile uses them (boto3, Google API client)
         strategy = StorageStrategy(self.profile['strategy'])
         if strategy == StorageStrategy.LOCAL_FILESYSTEM:
+            from text_extract_api.files.storage_strategies.local_filesystem import LocalFilesystemStorageStrategy
             self.strategy = LocalFilesystemStorageStrategy(self.profile)
         elif strategy == StorageStrategy.GOOGLE_DRIVE:
+            from text_extract_api.files.storage_strategies.google_drive import GoogleDriveStorageStrategy
             self.strategy = GoogleDriveStorageStrategy(self.profile)
         elif strategy == StorageStrategy.AWS_S3:
+            from text_extract_api.files.storage_strategies.aws_s3 import AWSS3StorageStrategy
             self.strategy = AWSS3StorageStrategy(self.profile)
         else:
             raise ValueError(f"Unknown storage strategy '{strategy}'")
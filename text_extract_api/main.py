@@ -1,21 +1,34 @@
+import json
 import os
 import pathlib
 import sys
 import time
-from typing import Optional
+import uuid
+from typing import Any, Dict, Literal, Optional
 
-import ollama
 import redis
+import redis.asyncio
 from celery.result import AsyncResult
 from fastapi import FastAPI, Form, UploadFile, File, HTTPException
-from pydantic import BaseModel, Field, field_validator
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, Field, ValidationInfo, field_validator
 
 from text_extract_api.celery_app import app as celery_app
+from text_extract_api.extract.cache import ResultCache, llm_result_cache, ocr_page_cache, ocr_result_cache
+from text_extract_api.extract.events import TaskEvents
+from text_extract_api.extract.pipeline import ocr_pipeline
+from text_extract_api.extract.progress import ProgressReporter
+from text_extract_api.extract.single_flight import SingleFlight
 from text_extract_api.extract.strategies.strategy import Strategy
-from text_extract_api.extract.tasks import ocr_task
-from text_extract_api.files.file_formats.file_format import FileFormat, FileField
+from text_extract_api.files.blob_store import BlobStore
+from text_extract_api.files.file_formats.file_format import MIME_SNIFF_SIZE, FileFormat, FileField
 from text_extract_api.files.storage_manager import StorageManager
 
+# Keep the imports of this module light - the OCR libraries (torch, EasyOCR, ...) are loaded by
+# the Celery workers only, Ollama and storage clients by the endpoints using them
+# (see tests/text_extract_api/test_startup.py)
+
 # Define base path as text_extract_api - required for keeping absolute namespaces
 sys.path.insert(0, str(pathlib.Path(__file__).parent.resolve()))
 
@@ -34,6 +47,53 @@ app = FastAPI()
 # Connect to Redis
 redis_url = os.getenv('REDIS_CACHE_URL', 'redis://redis:6379/1')
 redis_client = redis.StrictRedis.from_url(redis_url)
+async_redis_client = redis.asyncio.StrictRedis.from_url(redis_url)
+STREAM_KEEP_ALIVE_INTERVAL = 15
+UPLOAD_CHUNK_SIZE = int(os.getenv('UPLOAD_CHUNK_SIZE', 1024 * 1024))
+single_flight = SingleFlight(redis_client)
+blob_store = BlobStore()
+
+
+def submit_ocr_task(args: list, kwargs: dict, single_flight_key: str) -> dict:
+    """
+    Enqueues the OCR pipeline unless an identical one is already running - then the request
+    is coalesced with the running job and shares its task id and result.
+
+    The first argument is the staged upload reference (see `BlobStore`); it is dropped
+    right away when the request is coalesced or cannot be enqueued.
+    """
+    blob_ref = args[0]
+    task_id, coalesced = single_flight.acquire(single_flight_key, str(uuid.uuid4()))
+    if coalesced:
+        blob_store.delete(blob_ref)
+    else:
+        try:
+            ocr_pipeline(*args, **kwargs, single_flight_key=single_flight_key, job_id=task_id) \
+                .apply_async(task_id=task_id)
+        except Exception:
+            single_flight.release(single_flight_key, task_id)
+            blob_store.delete(blob_ref)
+            raise
+
+    return {"task_id": task_id, "coalesced": coalesced}
+
+
+def ocr_single_flight_key(file_hash: str, strategy_name: str, language: Optional[str], prompt: Optional[str],
+                          model: Optional[str], storage_profile: Optional[str],
+                          storage_filename: Optional[str], filename: Optional[str] = None, ocr_cache: bool = True,
+                          llm_cache: bool = True, llm_chunk_tokens: int = 0, llm_reduce: str = 'concat',
+                          single_pass: bool = False, json_schema: Optional[Dict] = None) -> str:
+    """
+    The OCR cache key extended by everything else that changes the task result - including the
+    name the file is stored under and the cache flags, so a request bypassing the caches is not
+    coalesced with a job which may serve cached results.
+    """
+    strategy = Strategy.strategy_info(strategy_name)  # the strategy itself is created by the workers only
+    ocr_cache_key = ocr_result_cache(redis_client).key(file_hash, strategy_name, strategy['model'], language,
+                                                       strategy['config_version'])
+    return SingleFlight.key(ocr_cache_key, ResultCache.digest(prompt), model, storage_profile, storage_filename,
+                            filename, ocr_cache, llm_cache, llm_chunk_tokens, llm_reduce, single_pass,
+                            ResultCache.digest(json.dumps(json_schema, sort_keys=True)))
 
 
 @app.post("/ocr")
@@ -45,7 +105,13 @@ async def ocr_endpoint(
         ocr_cache: bool = Form(...),
         storage_profile: str = Form('default'),
         storage_filename: str = Form(None),
-        language: str = Form('en')
+        language: str = Form('en'),
+        llm_cache: bool = Form(True),
+        pages_per_task: int = Form(0),
+        llm_chunk_tokens: int = Form(0),
+        llm_reduce: str = Form('concat'),
+        single_pass: bool = Form(False),
+        json_schema: str = Form(None)
 ):
     """
     Endpoint to extract text from an uploaded PDF, Image or Office file using different OCR strategies.
@@ -53,24 +119,46 @@ async def ocr_endpoint(
     """
     # Validate input
     try:
+        json_schema = json.loads(json_schema) if json_schema else None
         OcrFormRequest(strategy=strategy, prompt=prompt, model=model, ocr_cache=ocr_cache,
-                       storage_profile=storage_profile, storage_filename=storage_filename, language=language)
+                       storage_profile=storage_profile, storage_filename=storage_filename, language=language,
+                       llm_cache=llm_cache, pages_per_task=pages_per_task, llm_chunk_tokens=llm_chunk_tokens,
+                       llm_reduce=llm_reduce, single_pass=single_pass, json_schema=json_schema)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
     filename = storage_filename if storage_filename else file.filename
-    file_binary = await file.read()
-    file_format = FileFormat.from_binary(file_binary, filename, file.content_type)
+
+    # Stream the upload to the staging area chunk by chunk - hash is computed on the fly
+    # and the MIME type is sniffed from the first bytes only
+    with blob_store.writer(MIME_SNIFF_SIZE) as upload:
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            upload.write(chunk)
+
+    try:
+        if not upload.size:
+            raise ValueError("Uploaded file is empty.")
+        mime_type = file.content_type
+        if not mime_type or mime_type == 'application/octet-stream':
+            mime_type = FileFormat._guess_mime_type(binary_data=upload.head)
+        FileFormat._get_file_format_class(mime_type)
+    except ValueError as e:
+        blob_store.delete(upload.ref)
+        raise HTTPException(status_code=400, detail=str(e))
 
     print(
-        f"Processing Document {file_format.filename} with strategy: {strategy}, ocr_cache: {ocr_cache}, model: {model}, storage_profile: {storage_profile}, storage_filename: {storage_filename}, language: {language}, will be saved as: {filename}")
+        f"Processing Document {filename} ({mime_type}, {upload.size} bytes) with strategy: {strategy}, ocr_cache: {ocr_cache}, model: {model}, storage_profile: {storage_profile}, storage_filename: {storage_filename}, language: {language}, will be saved as: {filename}")
 
     # Asynchronous processing using Celery
-    task = ocr_task.apply_async(
-        args=[file_format.binary, strategy, file_format.filename, file_format.hash, ocr_cache, prompt, model, language,
+    return submit_ocr_task(
+        args=[upload.ref, strategy, filename, upload.hash, ocr_cache, prompt, model, language,
               storage_profile,
-              storage_filename])
-    return {"task_id": task.id}
+              storage_filename],
+        kwargs={'llm_cache': llm_cache, 'pages_per_task': pages_per_task, 'llm_chunk_tokens': llm_chunk_tokens,
+                'llm_reduce': llm_reduce, 'single_pass': single_pass, 'json_schema': json_schema},
+        single_flight_key=ocr_single_flight_key(upload.hash, strategy, language, prompt, model, storage_profile,
+                                                storage_filename, filename, ocr_cache, llm_cache, llm_chunk_tokens,
+                                                llm_reduce, single_pass, json_schema))
 
 
 # this is an alias for /ocr - to keep the backward compatibility
@@ -83,13 +171,20 @@ async def ocr_upload_endpoint(
         ocr_cache: bool = Form(...),
         storage_profile: str = Form('default'),
         storage_filename: str = Form(None),
-        language: str = Form('en')
+        language: str = Form('en'),
+        llm_cache: bool = Form(True),
+        pages_per_task: int = Form(0),
+        llm_chunk_tokens: int = Form(0),
+        llm_reduce: str = Form('concat'),
+        single_pass: bool = Form(False),
+        json_schema: str = Form(None)
 ):
     """
     Alias endpoint to extract text from an uploaded PDF/Office/Image file using different OCR strategies.
     Supports both synchronous and asynchronous processing.
     """
-    return await ocr_endpoint(strategy, prompt, model, file, ocr_cache, storage_profile, storage_filename, language)
+    return await ocr_endpoint(strategy, prompt, model, file, ocr_cache, storage_profile, storage_filename, language,
+                              llm_cache, pages_per_task, llm_chunk_tokens, llm_reduce, single_pass, json_schema)
 
 
 class OllamaGenerateRequest(BaseModel):
@@ -110,10 +205,22 @@ class OcrRequest(BaseModel):
     storage_profile: Optional[str] = Field('default', description="Storage profile to use")
     storage_filename: Optional[str] = Field(None, description="Storage filename to use")
     language: Optional[str] = Field('en', description="Language to use for OCR")
+    llm_cache: bool = Field(True, description="Enable LLM result caching, set to false to bypass it")
+    pages_per_task: int = Field(0, ge=0, description="Split PDFs into tasks of this many pages processed in "
+                                                    "parallel by all workers, 0 - no split")
+    llm_chunk_tokens: int = Field(0, ge=0, description="Transform texts longer than this many tokens with the "
+                                                      "LLM chunk by chunk, 0 - whole text at once")
+    llm_reduce: Literal['concat', 'merge'] = Field('concat', description="How the chunk outputs are combined: "
+                                                                         "concatenated or merged by the LLM")
+    single_pass: bool = Field(False, description="Answer the prompt straight from the document with the "
+                                                 "strategy's vision model, without a separate LLM pass")
+    json_schema: Optional[Dict[str, Any]] = Field(None, description="JSON schema the single pass answer must "
+                                                                    "follow")
 
     @field_validator('strategy')
     def validate_strategy(cls, v):
-        Strategy.get_strategy(v)
+        if not Strategy.exists(v):
+            raise ValueError(f"Unknown strategy '{v}'. Available: {', '.join(Strategy.strategy_names())}")
         return v
 
     @field_validator('storage_profile')
@@ -122,6 +229,13 @@ class OcrRequest(BaseModel):
             raise ValueError(f"Storage profile '{v}' does not exist.")
         return v
 
+    @field_validator('single_pass')
+    def validate_single_pass(cls, v, info: ValidationInfo):
+        strategy = info.data.get('strategy')
+        if v and strategy and not Strategy.strategy_info(strategy)['single_pass']:
+            raise ValueError(f"Strategy '{strategy}' does not support single pass extraction.")
+        return v
+
 
 class OcrFormRequest(BaseModel):
     strategy: str = Field(..., description="OCR strategy to use")
@@ -131,10 +245,22 @@ class OcrFormRequest(BaseModel):
     storage_profile: Optional[str] = Field('default', description="Storage profile to use")
     storage_filename: Optional[str] = Field(None, description="Storage filename to use")
     language: Optional[str] = Field('en', description="Language to use for OCR")
+    llm_cache: bool = Field(True, description="Enable LLM result caching, set to false to bypass it")
+    pages_per_task: int = Field(0, ge=0, description="Split PDFs into tasks of this many pages processed in "
+                                                    "parallel by all workers, 0 - no split")
+    llm_chunk_tokens: int = Field(0, ge=0, description="Transform texts longer than this many tokens with the "
+                                                      "LLM chunk by chunk, 0 - whole text at once")
+    llm_reduce: Literal['concat', 'merge'] = Field('concat', description="How the chunk outputs are combined: "
+                                                                         "concatenated or merged by the LLM")
+    single_pass: bool = Field(False, description="Answer the prompt straight from the document with the "
+                                                 "strategy's vision model, without a separate LLM pass")
+    json_schema: Optional[Dict[str, Any]] = Field(None, description="JSON schema the single pass answer must "
+                                                                    "follow")
 
     @field_validator('strategy')
     def validate_strategy(cls, v):
-        Strategy.get_strategy(v)
+        if not Strategy.exists(v):
+            raise ValueError(f"Unknown strategy '{v}'. Available: {', '.join(Strategy.strategy_names())}")
         return v
 
     @field_validator('storage_profile')
@@ -143,6 +269,13 @@ class OcrFormRequest(BaseModel):
             raise ValueError(f"Storage profile '{v}' does not exist.")
         return v
 
+    @field_validator('single_pass')
+    def validate_single_pass(cls, v, info: ValidationInfo):
+        strategy = info.data.get('strategy')
+        if v and strategy and not Strategy.strategy_info(strategy)['single_pass']:
+            raise ValueError(f"Strategy '{strategy}' does not support single pass extraction.")
+        return v
+
 
 @app.post("/ocr/request")
 async def ocr_request_endpoint(request: OcrRequest):
@@ -150,11 +283,9 @@ async def ocr_request_endpoint(request: OcrRequest):
     Endpoint to extract text from an uploaded PDF/Office/Image file using different OCR strategies.
     Supports both synchronous and asynchronous processing.
     """
-    # Validate input
-    request_data = request.model_dump()
+    # Input is already validated and the file decoded once by the `FileField`
     try:
-        OcrRequest(**request_data)
-        file = FileFormat.from_base64(request.file, request.storage_filename)
+        file = request.file.to_file_format(request.storage_filename)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -162,32 +293,108 @@ async def ocr_request_endpoint(request: OcrRequest):
         f"Processing {file.mime_type} with strategy: {request.strategy}, ocr_cache: {request.ocr_cache}, model: {request.model}, storage_profile: {request.storage_profile}, storage_filename: {request.storage_filename}, language: {request.language}")
 
     # Asynchronous processing using Celery
-    task = ocr_task.apply_async(
-        args=[file.binary, request.strategy, file.filename, file.hash, request.ocr_cache, request.prompt,
-              request.model, request.language, request.storage_profile, request.storage_filename])
-    return {"task_id": task.id}
+    return submit_ocr_task(
+        args=[blob_store.put(file.binary), request.strategy, file.filename, file.hash, request.ocr_cache, request.prompt,
+              request.model, request.language, request.storage_profile, request.storage_filename],
+        kwargs={'llm_cache': request.llm_cache, 'pages_per_task': request.pages_per_task,
+                'llm_chunk_tokens': request.llm_chunk_tokens, 'llm_reduce': request.llm_reduce,
+                'single_pass': request.single_pass, 'json_schema': request.json_schema},
+        single_flight_key=ocr_single_flight_key(file.hash, request.strategy, request.language, request.prompt,
+                                                request.model, request.storage_profile, request.storage_filename,
+                                                file.filename, request.ocr_cache, request.llm_cache,
+                                                request.llm_chunk_tokens, request.llm_reduce, request.single_pass,
+                                                request.json_schema))
 
 
 @app.get("/ocr/result/{task_id}")
-async def ocr_status(task_id: str):
+async def ocr_status(task_id: str, pages_from: int = 0):
     """
     Endpoint to get the status of an OCR task using task_id.
+
+    While the task is in progress, `pages` holds the pages extracted so far, starting
+    from the `pages_from`-th one - pass the number of pages already received to get only
+    the new ones.
     """
     task = AsyncResult(task_id, app=celery_app)
 
     if task.state == 'PENDING':
         return {"state": task.state, "status": "Task is pending..."}
-    elif task.state == 'PROGRESS':
+    elif task.state in ('PROGRESS', 'DONE'):
         task_info = task.info
         if task_info.get('start_time'):
             task_info['elapsed_time'] = time.time() - int(task_info.get('start_time'))
-        return {"state": task.state, "status": task.info.get("status"), "info": task_info}
+        return {"state": task.state, "status": task.info.get("status"), "info": task_info,
+                "pages": ProgressReporter.pages(redis_client, task_id, pages_from)}
     elif task.state == 'SUCCESS':
         return {"state": task.state, "status": "Task completed successfully.", "result": task.result}
     else:
         return {"state": task.state, "status": str(task.info)}
 
 
+def sse_message(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def task_done_message(task: AsyncResult) -> str:
+    if task.successful():
+        return sse_message('done', {'event': 'done', 'state': task.state, 'result': task.result})
+    return sse_message('done', {'event': 'done', 'state': task.state, 'error': str(task.info)})
+
+
+async def stream_task_events(task_id: str):
+    """
+    Relays the task events published by the worker (see `TaskEvents`) as Server-Sent Events
+    until the task is done. Subscribes first, then replays the pages recorded so far (see
+    `ProgressReporter.pages`) and relays the live events, skipping the pages already sent -
+    so no page is lost, even when the client connects after the task has started.
+    """
+    pubsub = async_redis_client.pubsub()
+    await pubsub.subscribe(TaskEvents.channel(task_id))
+    try:
+        task = AsyncResult(task_id, app=celery_app)
+        pages_sent = set()
+        for record in await run_in_threadpool(ProgressReporter.pages, redis_client, task_id):
+            pages_sent.add(record['page'])
+            yield sse_message('page', {'event': 'page', **record})
+
+        # The result backend client is blocking - keep it off the event loop
+        if await run_in_threadpool(task.ready):
+            yield await run_in_threadpool(task_done_message, task)
+            return
+
+        yield sse_message('state', {'event': 'state', 'state': await run_in_threadpool(lambda: task.state)})
+        while True:
+            message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=STREAM_KEEP_ALIVE_INTERVAL)
+            if message is None:
+                if await run_in_threadpool(task.ready):  # in case the `done` event was published before we subscribed
+                    yield await run_in_threadpool(task_done_message, task)
+                    return
+                yield ": keep-alive\n\n"
+                continue
+
+            data = json.loads(message['data'])
+            if data['event'] == 'page':
+                if data['page'] in pages_sent:
+                    continue  # already replayed
+                pages_sent.add(data['page'])
+            yield sse_message(data['event'], data)
+            if data['event'] == 'done':
+                return
+    finally:
+        await pubsub.unsubscribe()
+        await pubsub.aclose()
+
+
+@app.get("/ocr/stream/{task_id}")
+async def ocr_stream(task_id: str):
+    """
+    Endpoint streaming the extracted pages, LLM chunks and the final result of an OCR task
+    as Server-Sent Events.
+    """
+    return StreamingResponse(stream_task_events(task_id), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
 @app.post("/ocr/clear_cache")
 async def clear_ocr_cache():
     """
@@ -197,6 +404,15 @@ async def clear_ocr_cache():
     return {"status": "OCR cache cleared"}
 
 
+@app.get("/ocr/cache/stats")
+async def ocr_cache_stats():
+    """
+    Endpoint to get the OCR and LLM result cache hit/miss counters and size.
+    """
+    return {"ocr": ocr_result_cache(redis_client).stats(), "ocr_page": ocr_page_cache(redis_client).stats(),
+            "llm": llm_result_cache(redis_client).stats()}
+
+
 @app.get("/storage/list")
 async def list_files(storage_profile: str = 'default'):
     """
@@ -232,14 +448,17 @@ async def pull_llama(request: OllamaPullRequest):
     """
     Endpoint to pull the latest Llama model from the Ollama API.
     """
+    import ollama
+    from text_extract_api.extract.ollama_pool import ollama_pool
+
     print("Pulling " + request.model)
     try:
-        response = ollama.pull(request.model)
+        responses = ollama_pool().pull(request.model)
     except ollama.ResponseError as e:
         print('Error:', e.error)
         raise HTTPException(status_code=500, detail="Failed to pull Llama model from Ollama API")
 
-    return {"status": response.get("status", "Model pulled successfully")}
+    return {"status": responses[-1].get("status", "Model pulled successfully")}
 
 
 @app.post("/llm/generate")
@@ -247,19 +466,55 @@ async def generate_llama(request: OllamaGenerateRequest):
     """
     Endpoint to generate text using Llama 3.1 model (and other models) via the Ollama API.
     """
+    import ollama
+    from text_extract_api.extract.ollama_pool import ollama_pool
+
     print(request)
     if not request.prompt:
         raise HTTPException(status_code=400, detail="No prompt provided")
 
     try:
-        response = ollama.generate(request.model, request.prompt)
+        with ollama_pool().client(request.model) as client:
+            response = client.generate(request.model, request.prompt)
     except ollama.ResponseError as e:
         print('Error:', e.error)
         if e.status_code == 404:
             print("Error: ", e.error)
-            ollama.pull(request.model)
+            ollama_pool().pull(request.model)
 
         raise HTTPException(status_code=500, detail="Failed to generate text with Ollama API")
 
     generated_text = response.get("response", "")
     return {"generated_text": generated_text}
+
+
+@app.get("/ollama/hosts")
+def ollama_hosts():
+    """
+    Endpoint to check the Ollama hosts (`OLLAMA_HOSTS`) and get their health and request statistics.
+    """
+    from text_extract_api.extract.ollama_pool import ollama_pool
+
+    pool = ollama_pool()
+    pool.check()
+    return {"hosts": pool.stats()}
+
+
+@app.get("/ready")
+def ready():
+    """
+    Readiness endpoint - 200 when the models of the strategies with `warm_up` set in
+    config/strategies.yaml are loaded on at least one Ollama host, 503 until then.
+    """
+    from text_extract_api.extract.ollama_pool import ollama_pool
+
+    pool = ollama_pool()
+    pool.check()
+    models = {}
+    for name, config in Strategy.strategies_config().items():
+        if config.get('warm_up') and config.get('model'):
+            hosts = pool.resident(config['model'])
+            models[config['model']] = {'resident': bool(hosts), 'hosts': hosts}
+
+    is_ready = all(model['resident'] for model in models.values())
+    return JSONResponse(status_code=200 if is_ready else 503, content={"ready": is_ready, "models": models})
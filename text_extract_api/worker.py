@@ -0,0 +1,51 @@
+import argparse
+import os
+from typing import Dict, List
+
+from text_extract_api.celery_app import app, STAGE_QUEUES, EXTRACT_TASK
+from text_extract_api.extract.strategies.strategy import Strategy
+
+DEFAULT_WORKER_SETTINGS = {
+    'pool': 'solo',
+    'concurrency': 1,
+    'prefetch_multiplier': 1,
+}
+
+
+def worker_argv(strategy_names: List[str], strategies_config: Dict[str, Dict]) -> List[str]:
+    """
+    Celery worker arguments for a worker serving the given strategies: it consumes their
+    queues and takes the pool, concurrency and prefetch multiplier from the `worker`
+    settings of the first one (defaults - a single solo process prefetching one task).
+    """
+    queues = []
+    for name in strategy_names:
+        if name not in strategies_config:
+            raise ValueError(f"Unknown strategy '{name}'. Available: {', '.join(strategies_config.keys())}")
+        queues.append(strategies_config[name].get('queue') or STAGE_QUEUES[EXTRACT_TASK])
+
+    settings = {**DEFAULT_WORKER_SETTINGS, **(strategies_config[strategy_names[0]].get('worker') or {})}
+    return [
+        'worker',
+        '-Q', ','.join(dict.fromkeys(queues)),
+        f"--pool={settings['pool']}",
+        f"--concurrency={settings['concurrency']}",
+        f"--prefetch-multiplier={settings['prefetch_multiplier']}",
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Start a Celery worker tuned for the given OCR strategies (see `queue` and `worker` "
+                    "in config/strategies.yaml). Other arguments are passed to the Celery worker.")
+    parser.add_argument('strategies', nargs='+', help='Strategy names, e.g. easyocr')
+    args, celery_args = parser.parse_known_args()
+
+    os.environ['WORKER_STRATEGIES'] = ','.join(args.strategies)  # only these are warmed up
+    argv = worker_argv(args.strategies, Strategy.load_config()) + (celery_args or ['--loglevel=info'])
+    print(f"Starting Celery worker: {' '.join(argv)}")
+    app.worker_main(argv)
+
+
+if __name__ == '__main__':
+    main()